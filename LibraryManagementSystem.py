@@ -1,15 +1,74 @@
 import csv
 import heapq as hq
+import io
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from itertools import islice
+from contextlib import contextmanager, nullcontext, redirect_stdout
 from datetime import datetime
-from colorama import Fore, Style, init
+from operator import itemgetter
 
-# Initialize colorama
-init(autoreset=True)
+# ===============================================
+# Console Output (colorama is loaded lazily, output can be switched off for headless runs)
+# ===============================================
+_settings = {"colors": True}
+_output = threading.local()     # Quiet mode is per thread, so a background load can be silenced without muting the menu
+
+class _NoColors:        # Stands in for colorama's Fore/Style when colors are disabled: every color is an empty string
+    def __getattr__(self, name):
+        return ''
+
+class _LazyColors:      # Imports and initializes colorama the first time a color is used
+    def __init__(self, name):
+        self._name = name
+        self._colors = None
+
+    def __getattr__(self, attr):
+        if self._colors is None:
+            if _settings["colors"]:
+                import colorama
+                colorama.init(autoreset=True)
+                self._colors = getattr(colorama, self._name)
+            else:
+                self._colors = _NoColors()
+        value = getattr(self._colors, attr)
+        setattr(self, attr, value)      # Cache it, so later lookups are plain attribute reads
+        return value
+
+Fore = _LazyColors("Fore")
+Style = _LazyColors("Style")
+
+def set_colors(enabled):        # Must be called before the first colored output
+    _settings["colors"] = enabled
+
+def echo(*args, **kwargs):      # print() for the library classes. Does nothing in quiet mode.
+    if not getattr(_output, "quiet", False):
+        print(*args, **kwargs)
+
+@contextmanager
+def quiet_output():     # Silences echo() inside the with-block, so the library only returns results
+    previous = getattr(_output, "quiet", False)
+    _output.quiet = True
+    try:
+        yield
+    finally:
+        _output.quiet = previous
 
 # ===============================================
 # Base class for Book Management (abstracts common logic for both Static and Dynamic Data Structures)
 # ===============================================
 class BookManagerBase:
+    event_bus = None        # Optional ChangeEventBus. When set, every change to the catalog is published to it.
+
+    def _publish(self, event_type, isbn, title, user='', date=''):
+        if self.event_bus:
+            self.event_bus.publish(event_type, isbn, title, user, date)
+
     def search_book(self, isbn=None, title=None):
         # Loop through each book and check if its ISBN or title matches the given search criteria
         for book in self.get_books():
@@ -22,14 +81,17 @@ class BookManagerBase:
     def display_books(self):
         books = self.get_books()
         if not books:  # Checks if the books list is empty
-            print(Fore.RED + "\nNo books available.")
+            echo(Fore.RED + "\nNo books available.")
         else:
             for book in books:  # Loop through each book and print its details
-                print(Fore.GREEN + f"{book.get('isbn', 'N/A')}\t|\t{book.get('title', 'N/A')}")  # Safely handle missing 'isbn' or 'title'
+                echo(Fore.GREEN + f"{book.get('isbn', 'N/A')}\t|\t{book.get('title', 'N/A')}")  # Safely handle missing 'isbn' or 'title'
 
     def get_books(self):        # Placeholder method to be overridden by subclasses
         raise NotImplementedError   # Force subclasses to implement their own method for getting books
 
+    def iter_books(self):       # Streams books one at a time. Subclasses can override to avoid building the full list.
+        return iter(self.get_books())
+
     def get_borrowed_books(self):
         books = self.get_books()
         # Safely access 'user' and 'date' to avoid KeyError
@@ -42,15 +104,15 @@ class BookManagerBase:
     def display_user_borrowed_books(self, user=None):
         user_borrowed_books = self.get_user_borrowed_books(user)
         if not user_borrowed_books:  # Check if the user has borrowed any books
-            print(Fore.RED + "\nNo books available.")
+            echo(Fore.RED + "\nNo books available.")
         else:
-            print(Fore.YELLOW + "-------------------------------------------------------------------")
-            print(Fore.YELLOW + "ISBN            |       Title\t\t|\tDate Borrowed")
-            print(Fore.YELLOW + "-------------------------------------------------------------------")
+            echo(Fore.YELLOW + "-------------------------------------------------------------------")
+            echo(Fore.YELLOW + "ISBN            |       Title\t\t|\tDate Borrowed")
+            echo(Fore.YELLOW + "-------------------------------------------------------------------")
             for book in user_borrowed_books:
                 # Safely handle missing 'isbn', 'title', or 'date' to avoid KeyError
-                print(Fore.GREEN + f"{book.get('isbn', 'N/A')}\t|\t{book.get('title', 'N/A')}\t|\t{book.get('date', 'N/A')}")
-            print("-------------------------------------------------------------------")  # Close the display with a separator
+                echo(Fore.GREEN + f"{book.get('isbn', 'N/A')}\t|\t{book.get('title', 'N/A')}\t|\t{book.get('date', 'N/A')}")
+            echo("-------------------------------------------------------------------")  # Close the display with a separator
 
     def get_max_heap_overdue_books(self, days_due=None):
         borrowed_books = self.get_borrowed_books()
@@ -72,11 +134,11 @@ class BookManagerBase:
     def display_max_heap_overdue_books(self, days_due=None):
         heap_transform_list = self.get_max_heap_overdue_books(days_due)
         if not heap_transform_list:
-            print(Fore.RED + "\nNo overdue books.")            
+            echo(Fore.RED + "\nNo overdue books.")            
         else:    
-            print(Fore.MAGENTA + "-----------------------------------------------------------------------------------------------------------")
-            print(Fore.MAGENTA + "ISBN            |  Borrowed by\t|\tDate Borrowed\t| Days overdue\t|       Title")
-            print(Fore.MAGENTA + "-----------------------------------------------------------------------------------------------------------")        
+            echo(Fore.MAGENTA + "-----------------------------------------------------------------------------------------------------------")
+            echo(Fore.MAGENTA + "ISBN            |  Borrowed by\t|\tDate Borrowed\t| Days overdue\t|       Title")
+            echo(Fore.MAGENTA + "-----------------------------------------------------------------------------------------------------------")        
             while len(heap_transform_list) > 0:
                 # Pop the entry with the largest days_overdue and rearrange the max-heap structure.
                 entry = hq.heappop(heap_transform_list)[1]
@@ -86,39 +148,136 @@ class BookManagerBase:
                     user = entry[0][2][1]
                     date = entry[0][3][1]
                     days_overdue = entry[1]
-                    print(f"{isbn}\t|\t{user}\t|\t{date}\t|\t{days_overdue}\t|\t{title}")
-            print(Fore.MAGENTA + "-----------------------------------------------------------------------------------------------------------")
-            print(Fore.MAGENTA + "-----------------------------------------------------------------------------------------------------------\n")
+                    echo(f"{isbn}\t|\t{user}\t|\t{date}\t|\t{days_overdue}\t|\t{title}")
+            echo(Fore.MAGENTA + "-----------------------------------------------------------------------------------------------------------")
+            echo(Fore.MAGENTA + "-----------------------------------------------------------------------------------------------------------\n")
     
     def borrow_book(self, isbn=None, title=None, user=None, date=None):
         book = self.search_book(isbn, title)
         if book:
             title = book['title']
-            if title in self.borrow_queue and self.borrow_queue[title]:
-                self.borrow_queue[title].append({"user": user, "date": date})
-                print(Fore.GREEN + f"Book '{title}' is currently borrowed. {user}, you have been added to the waiting queue.")
+            isbn = book['isbn']
+            # borrow_queue[isbn][0] is the current borrower of that copy, the entries after it are waiting in order
+            if book['user'] != '':
+                if not self.borrow_queue.get(isbn):       # Borrowed before the queue existed (e.g. loaded from CSV)
+                    self.borrow_queue[isbn] = [{"user": book['user'], "date": book['date']}]
+                self.borrow_queue[isbn].append({"user": user, "date": date})
+                echo(Fore.GREEN + f"Book '{title}' is currently borrowed. {user}, you have been added to the waiting queue.")
+                self._publish("queue_joined", book['isbn'], title, user, date)
+                return False    # Added to the waiting queue
             else:
-                self.borrow_queue[title] = [{"user": user, "date": date}]
+                self.borrow_queue[isbn] = [{"user": user, "date": date}]     # The copy is free, so any queue left for it is stale
                 if self.borrow_book_sub(book, user, date):   #Check if method exists
-                    print(Fore.GREEN + f"\nBook '{title}' borrowed by {user} on {date}.")                    
+                    echo(Fore.GREEN + f"\nBook '{title}' borrowed by {user} on {date}.")                    
+                    return True
                 else:
-                    print(Fore.GREEN + f"\nError borrowing the book (The borrow function is not implemented for this data structure.)")
+                    echo(Fore.GREEN + f"\nError borrowing the book (The borrow function is not implemented for this data structure.)")
+                    return False
         else:
-            print(f"Book '{title}' not found.")
+            echo(f"Book '{title}' not found.")
+            return None
 
     def borrow_book_sub(self, book=None, user=None, date=None):
         return False    #Method does not exist outside the subclasses
 
+    def _next_borrower(self, isbn, user):        # On return: the returning borrower leaves the queue, the next reservation (if any) takes the copy over
+        queue = self.borrow_queue.get(isbn)
+        if not queue:
+            return None
+        for i, entry in enumerate(queue):
+            if entry['user'] == user:
+                del queue[i]
+                break
+        if not queue:
+            del self.borrow_queue[isbn]     # Nobody left waiting for this copy
+            return None
+        return queue[0]
+
     def display_borrow_queue(self):
         if not self.borrow_queue:
-            print(Fore.RED + "\nNo books are currently borrowed.")
+            echo(Fore.RED + "\nNo books are currently borrowed.")
         else:
-            print("Borrow Queue:")
-            for title, users in self.borrow_queue.items():
-                print(f"Book Title: {title}")
+            echo("Borrow Queue:")
+            for isbn, users in self.borrow_queue.items():
+                book = self.search_book(isbn=isbn)
+                echo(f"Book Title: {book['title'] if book else 'N/A'} (ISBN: {isbn})")
                 for i, user_info in enumerate(users):
                     status = "Borrowed" if i == 0 else "Waiting"
-                    print(Fore.GREEN + f"  User: {user_info['user']}, Borrow Date: {user_info['date']}, Status: {status}")
+                    echo(Fore.GREEN + f"  User: {user_info['user']}, Borrow Date: {user_info['date']}, Status: {status}")
+
+    def snapshot(self):     # Point-in-time, read-only copy of the books. The tree structures override this with an O(1) version.
+        return BookSnapshot(iter, [dict(book) for book in self.iter_books()])
+
+# ===============================================
+# Copy-on-Write Snapshots (Point-in-time views of the tree structures for exports and reports)
+# ===============================================
+# Every tree node records the epoch it was created in. Taking a snapshot only keeps the current root and starts
+# a new epoch. From then on a writer copies each older node on its path before changing it (path copying),
+# so the nodes reachable from the snapshot never change and readers never block or slow down the writers.
+class BookSnapshot(BookManagerBase):        # Read-only view returned by snapshot(). It holds the books only, not the borrow queue.
+    # Use it as a context manager (or call close()) so a snapshot that holds a resource, such as SQLite's read
+    # connection, releases it as soon as the report or export is done.
+    def __init__(self, iter_nodes, root, close=None):
+        self._iter_nodes = iter_nodes       # Generator function that yields the books under root in ISBN order
+        self._root = root
+        self._close = close                 # Releases what the snapshot holds (None if it holds nothing)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._close:
+            self._close()
+            self._close = None
+
+    def get_books(self):
+        return list(self.iter_books())
+
+    def iter_books(self):
+        return self._iter_nodes(self._root)
+
+    def snapshot(self):     # A snapshot never changes, so a snapshot of it is the same view (closing it is left to the original)
+        return BookSnapshot(self._iter_nodes, self._root)
+
+class CopyOnWriteTree(BookManagerBase):
+    epoch = 0       # Current write epoch. Nodes created in an older epoch may be shared with a snapshot.
+
+    def _writable(self, node):      # Returns a node that is safe to change: the node itself, or a copy if a snapshot can still see it
+        if node is None or node.epoch == self.epoch:
+            return node
+        return node.copy(self.epoch)
+
+    # The two helpers below are for the binary trees (BST and AVL Tree); the B+ tree overrides _iter_nodes
+    def _iter_nodes(self, node):        # In-order traversal with an explicit stack, yields the books one at a time
+        stack = []
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield {"isbn": node.isbn, "title": node.title, "user": node.user, "date": node.date}
+            node = node.right
+
+    def _writable_node(self, isbn):     # Copies the path from the root to the ISBN's node (which must exist) and returns the node
+        self.root = node = self._writable(self.root)
+        while isbn != node.isbn:
+            child = self._writable(node.left if isbn < node.isbn else node.right)
+            if isbn < node.isbn:
+                node.left = child
+            else:
+                node.right = child
+            node = child
+        return node
+
+    def iter_books(self):
+        return self._iter_nodes(self.root)
+
+    def snapshot(self):     # O(1): keep the current root and make every existing node copy-on-write
+        self.epoch += 1
+        return BookSnapshot(self._iter_nodes, self.root)
 
 # ===============================================
 # Static Data Structure: Array (Max capacity of 100)
@@ -134,14 +293,16 @@ class StaticBookArray(BookManagerBase):
     def add_book(self, isbn, title, user='', date=''):
         if len(self.books) < self.capacity:     #If length of array is less than capacity, append the new book to the books array.
             self.books.append({"isbn": isbn, "title": title, "user": user, "date": date})
+            self._publish("book_added", isbn, title, user, date)
         else:       #Else, the array will not accept any more books as it is full.
-            print(Fore.RED + "\nLibrary is full.")
+            echo(Fore.RED + "\nLibrary is full.")
 
     def remove_book(self, isbn=None, title=None):
-        book = self.search_book(isbn, title)        #Calls search_book method inherited from BookManagerBase and stores in book variable.
-        if book:        #If book is found and not None, remove the book from the books array.
-            self.books.remove(book)
-            return True
+        for index, book in enumerate(self.books):      #Single pass: find the position of the book and delete it there (no second equality scan).
+            if (isbn and book.get('isbn', None) == isbn) or (title and book.get('title', '').lower() == title.lower()):
+                del self.books[index]
+                self._publish("book_removed", book['isbn'], book['title'], book['user'], book['date'])
+                return True
         return False
     
     def get_books(self):    #Defined function to override base class method from BookManagerBase.        
@@ -151,38 +312,196 @@ class StaticBookArray(BookManagerBase):
         borrowed_book = book
         
         if borrowed_book['user'] == '':  # Check if the book is available
-            borrowed_book['user'] = user            # Assign borrow details
+            borrowed_book['user'] = user            # Assign borrow details (book is the dict stored in the list, so it is updated in place)
             borrowed_book['date'] = date
-            index = self.books.index(book)
-            self.books[index] = borrowed_book       # Update the book details in the list
+            self._publish("book_borrowed", borrowed_book['isbn'], borrowed_book['title'], user, date)
             return True
         else:
             # Book is already borrowed, add to the reservation queue
-            if borrowed_book['title'] in self.borrow_queue:
-                self.borrow_queue[borrowed_book['title']].append({"user": user, "date": date})
+            if borrowed_book['isbn'] in self.borrow_queue:
+                self.borrow_queue[borrowed_book['isbn']].append({"user": user, "date": date})
             else:
-                self.borrow_queue[borrowed_book['title']] = [{"user": user, "date": date}]
-            print(Fore.GREEN + f"Book '{borrowed_book['title']}' is currently borrowed. {user}, you have been added to the waiting queue.")
+                self.borrow_queue[borrowed_book['isbn']] = [{"user": user, "date": date}]
+            echo(Fore.GREEN + f"Book '{borrowed_book['title']}' is currently borrowed. {user}, you have been added to the waiting queue.")
+            self._publish("queue_joined", borrowed_book['isbn'], borrowed_book['title'], user, date)
             return False
 
     def return_book(self, isbn=None, user=None):
-        borrowed_book = self.search_book(isbn, None)  # Find the book by ISBN
-        if borrowed_book and borrowed_book['user'] == user:  # Check if the user is correct
-            borrowed_book['user'] = ''  # Clear the user field
+        # Find the copy with this ISBN that the user has (the array accepts duplicate ISBNs)
+        borrowed_book = next((book for book in self.books if book['isbn'] == isbn and book['user'] == user), None)
+        if borrowed_book:
+            borrowed_book['user'] = ''  # Clear the user field (the dict is stored in the array, so it is updated in place)
             borrowed_book['date'] = ''  # Clear the date field
-            index = self.books.index(borrowed_book)  # Find the index of the book
-            self.books[index] = borrowed_book  # Update the book in the array
+            self._publish("book_returned", borrowed_book['isbn'], borrowed_book['title'], user)
 
             # Check the reservation queue for the book
-            if borrowed_book['title'] in self.borrow_queue and len(self.borrow_queue[borrowed_book['title']]) > 0:
-                next_user = self.borrow_queue[borrowed_book['title']].pop(0)
-                print(Fore.GREEN + f"Book '{borrowed_book['title']}' is now available for {next_user['user']}.")
+            next_user = self._next_borrower(borrowed_book['isbn'], user)
+            if next_user:
+                echo(Fore.GREEN + f"Book '{borrowed_book['title']}' is now available for {next_user['user']}.")
                 borrowed_book['user'] = next_user['user']
                 borrowed_book['date'] = next_user['date']
-                self.books[index] = borrowed_book  # Update the book details again
+                self._publish("queue_handoff", borrowed_book['isbn'], borrowed_book['title'], next_user['user'], next_user['date'])
             return True
         return False  # Book not found or not borrowed by the given user
 
+# ===============================================
+# Sorted Array (Parallel arrays ordered by ISBN, binary search lookups)
+# ===============================================
+class SortedBookArray(BookManagerBase):
+    def __init__(self, batch_size=256):
+        self.isbns = []         # Sorted ISBNs. The other arrays are kept in the same order, so one index gives the whole book.
+        self.titles = []
+        self.users = []
+        self.dates = []
+        self.pending = {}       # Batched inserts (isbn -> [isbn, title, user, date]) that have not been merged into the arrays yet
+        self.batch_size = batch_size        # Smallest batch; the batch grows with the arrays (see add_book)
+        self.borrow_queue = {}
+
+    def add_book(self, isbn, title, user='', date=''):
+        if not self.pending and (not self.isbns or isbn > self.isbns[-1]):
+            # Fast path: books arriving in ISBN order (e.g. loading a saved CSV) are simply appended
+            self.isbns.append(isbn)
+            self.titles.append(title)
+            self.users.append(user)
+            self.dates.append(date)
+            self._publish("book_added", isbn, title, user, date)
+            return
+        if isbn in self.pending or self._index(isbn) is not None:
+            echo(Fore.RED + "\nBook with this ISBN already exists.")
+            return
+        self.pending[isbn] = [isbn, title, user, date]
+        self._publish("book_added", isbn, title, user, date)
+        # The batch may grow as large as the arrays, so each merge copies at most two rows per batched book and
+        # loading in random order stays O(n log n) overall instead of rebuilding all four arrays every batch_size books
+        if len(self.pending) >= max(self.batch_size, len(self.isbns)):
+            self._merge_pending()
+
+    def _merge_pending(self):       # Merges the batch into the arrays with one sort instead of one list.insert per book
+        if not self.pending:
+            return
+        rows = list(zip(self.isbns, self.titles, self.users, self.dates))
+        rows.extend(sorted(self.pending.values()))
+        rows.sort(key=lambda row: row[0])       # Both halves are already sorted runs, so Timsort only has to merge them
+        self.pending = {}
+        self.isbns = [row[0] for row in rows]
+        self.titles = [row[1] for row in rows]
+        self.users = [row[2] for row in rows]
+        self.dates = [row[3] for row in rows]
+
+    # Utility function to find the position of an ISBN in the merged arrays using binary search
+    def _index(self, isbn):
+        i = bisect_left(self.isbns, isbn)
+        if i < len(self.isbns) and self.isbns[i] == isbn:
+            return i
+        return None
+
+    # ISBN lookups check the pending batch (a dict) and bisect the merged arrays, so adds and lookups can interleave
+    # without a merge each time. Only title searches and scans merge the batch first.
+    def _find(self, isbn=None, title=None):     # Index in the merged arrays, or None
+        if isbn:
+            return self._index(isbn)
+        if title:
+            self._merge_pending()
+            title = title.lower()
+            for i, book_title in enumerate(self.titles):
+                if book_title.lower() == title:
+                    return i
+        return None
+
+    def _book(self, i):
+        return {"isbn": self.isbns[i], "title": self.titles[i], "user": self.users[i], "date": self.dates[i]}
+
+    def _loan(self, isbn):      # (title, user) of a book in the batch or the arrays, or None if it is not in the catalog
+        row = self.pending.get(isbn)
+        if row:
+            return row[1], row[2]
+        i = self._index(isbn)
+        if i is None:
+            return None
+        return self.titles[i], self.users[i]
+
+    def _set_loan(self, isbn, user, date):
+        row = self.pending.get(isbn)
+        if row:
+            row[2], row[3] = user, date
+        else:
+            i = self._index(isbn)
+            self.users[i], self.dates[i] = user, date
+
+    def remove_book(self, isbn=None, title=None):
+        if isbn in self.pending:
+            row = self.pending.pop(isbn)
+            removed_book = {"isbn": row[0], "title": row[1], "user": row[2], "date": row[3]}
+        else:
+            i = self._find(isbn, title)
+            if i is None:
+                return None
+            removed_book = self._book(i)
+            del self.isbns[i], self.titles[i], self.users[i], self.dates[i]
+        self._publish("book_removed", **removed_book)
+        return removed_book
+
+    def search_book(self, isbn=None, title=None):
+        if isbn in self.pending:
+            row = self.pending[isbn]
+            return {"isbn": row[0], "title": row[1], "user": row[2], "date": row[3]}
+        i = self._find(isbn, title)
+        if i is None:
+            return None
+        return self._book(i)
+
+    def get_books(self):
+        self._merge_pending()
+        return [self._book(i) for i in range(len(self.isbns))]
+
+    def iter_books(self):
+        self._merge_pending()
+        for i in range(len(self.isbns)):
+            yield self._book(i)
+
+    def display_books(self):
+        self._merge_pending()
+        if not self.isbns:
+            echo(Fore.RED + "\nNo books available.")
+        for isbn, title in zip(self.isbns, self.titles):
+            echo(Fore.GREEN + f"{isbn}\t|\t{title}")
+
+    def get_borrowed_books(self):
+        self._merge_pending()
+        return [self._book(i) for i, user in enumerate(self.users) if user != '' and self.dates[i] != '']
+
+    def borrow_book_sub(self, book=None, user=None, date=None):
+        loan = self._loan(book['isbn'])
+        if loan is None:
+            return None
+        title, current_user = loan
+        if current_user == '':     # Check if the book is available
+            self._set_loan(book['isbn'], user, date)
+            self._publish("book_borrowed", book['isbn'], title, user, date)
+            return True
+        if book['isbn'] in self.borrow_queue:
+            self.borrow_queue[book['isbn']].append({"user": user, "date": date})
+        else:
+            self.borrow_queue[book['isbn']] = [{"user": user, "date": date}]
+        echo(Fore.GREEN + f"\nBook '{title}' is currently borrowed. {user}, you have been added to the waiting queue.")
+        self._publish("queue_joined", book['isbn'], title, user, date)
+        return False
+
+    def return_book(self, isbn=None, user=None):
+        loan = self._loan(isbn)
+        if loan is None or loan[1] != user:
+            return False        # Book not found or not borrowed by the given user
+        self._set_loan(isbn, '', '')
+        # Check the reservation queue for the book
+        title = loan[0]
+        self._publish("book_returned", isbn, title, user)
+        next_user = self._next_borrower(isbn, user)
+        if next_user:
+            echo(Fore.GREEN + f"\nBook '{title}' is now available for {next_user['user']}.")
+            self._set_loan(isbn, next_user['user'], next_user['date'])
+            self._publish("queue_handoff", isbn, title, next_user['user'], next_user['date'])
+        return True
+
 # ===============================================
 # Dynamic Data Structure: Linked List
 # ===============================================
@@ -208,6 +527,7 @@ class DynamicBookLinkedList(BookManagerBase):   # Manages the books as a linked
             while current.next:             # Traverse to the end of the list.
                 current = current.next
             current.next = new_node         # Add the new node at the end of the list.
+        self._publish("book_added", isbn, title, user, date)
 
     def remove_book(self, isbn=None, title=None):
         current, prev = self.head, None     #current: point to first node, prev: keep track of previous node in the list
@@ -217,6 +537,7 @@ class DynamicBookLinkedList(BookManagerBase):   # Manages the books as a linked
                     prev.next = current.next    # Remove the current node.
                 else:
                     self.head = current.next    # Remove the head node.
+                self._publish("book_removed", current.isbn, current.title, current.user, current.date)
                 return True
             prev, current = current, current.next       
         return False
@@ -242,15 +563,17 @@ class DynamicBookLinkedList(BookManagerBase):   # Manages the books as a linked
                 if current.user == '':  # Check if the book is available
                     current.user = user     # Assign borrow details
                     current.date = date  
-                    print(f"\nBook '{current.title}' borrowed by {user} on {date}.")
+                    echo(f"\nBook '{current.title}' borrowed by {user} on {date}.")
+                    self._publish("book_borrowed", current.isbn, current.title, user, date)
                     return True
                 else:
                     # Book is already borrowed, add to the reservation queue
-                    if current.title in self.borrow_queue:
-                        self.borrow_queue[current.title].append({"user": user, "date": date})
+                    if current.isbn in self.borrow_queue:
+                        self.borrow_queue[current.isbn].append({"user": user, "date": date})
                     else:
-                        self.borrow_queue[current.title] = [{"user": user, "date": date}]
-                    print(Fore.GREEN + f"\nBook '{current.title}' is currently borrowed. {user}, you have been added to the waiting queue.")
+                        self.borrow_queue[current.isbn] = [{"user": user, "date": date}]
+                    echo(Fore.GREEN + f"\nBook '{current.title}' is currently borrowed. {user}, you have been added to the waiting queue.")
+                    self._publish("queue_joined", current.isbn, current.title, user, date)
                     return False
             current = current.next
         return False  # Book not found
@@ -261,12 +584,14 @@ class DynamicBookLinkedList(BookManagerBase):   # Manages the books as a linked
             if current.isbn == isbn and current.user == user:
                 current.user = ''  # Clear user in the node
                 current.date = ''  # Clear borrow date in the node
+                self._publish("book_returned", current.isbn, current.title, user)
                 # Check if there are any users in the reservation queue
-                if current.title in self.borrow_queue and len(self.borrow_queue[current.title]) > 0:
-                    next_user = self.borrow_queue[current.title].pop(0)
-                    print(Fore.GREEN + f"Book '{current.title}' is now available for {next_user['user']}.")
+                next_user = self._next_borrower(current.isbn, user)
+                if next_user:
+                    echo(Fore.GREEN + f"Book '{current.title}' is now available for {next_user['user']}.")
                     current.user = next_user['user']  # Assign the book to the next user in the queue
                     current.date = next_user['date']
+                    self._publish("queue_handoff", current.isbn, current.title, next_user['user'], next_user['date'])
                 return True  # Successfully returned the book
             current = current.next
         return False  # Book not found or not borrowed by the given user
@@ -293,45 +618,53 @@ class UndoRedoStack:
 
     def undo(self, book_manager):       #This method performs the undo operation.
         if not self.undo_stack:
-            print("\nNo actions to undo.")      #If undo_stack is empty, exit.
-            return
+            echo("\nNo actions to undo.")      #If undo_stack is empty, exit.
+            return None
         action = self.undo_stack.pop()      #If there is an action to undo, remove the most recent action from the undo_stack and stores in the action variable.
         if action['type'] == 'add':     #Checks if action is addition of a book.
             book_manager.remove_book(isbn=action['isbn'])       #Calls remove_book method, removes the book that was added. Uses the isbn stored in the action dictionary.
             self.push_redo(action)      #Move this action to redo stack.
-            print(Fore.GREEN + f"\nUndo: Removed book {action['isbn']}")
+            echo(Fore.GREEN + f"\nUndo: Removed book {action['isbn']}")
         elif action['type'] == 'remove':        #Checks if action is removal of a book.
-            book_manager.add_book(action['isbn'], action['title'], user, date)      #Calls add_book method, adds the recently removed book.
+            book_manager.add_book(action['isbn'], action['title'], action.get('user', ''), action.get('date', ''))      #Calls add_book method, adds the recently removed book.
             self.push_redo(action)      #Move this action to redo stack.
-            print(Fore.GREEN + f"\nUndo: Re-added book {action['isbn']}")
+            echo(Fore.GREEN + f"\nUndo: Re-added book {action['isbn']}")
+        return action       #Returns the action that was undone.
 
     def redo(self, book_manager):       #This method performs the redo operation.
         if not self.redo_stack:
-            print(Fore.RED + "\nNo actions to redo.")
-            return
+            echo(Fore.RED + "\nNo actions to redo.")
+            return None
         action = self.redo_stack.pop()
         if action['type'] == 'add':
-            book_manager.add_book(action['isbn'], action['title'], user, date)
+            book_manager.add_book(action['isbn'], action['title'], action.get('user', ''), action.get('date', ''))
             self.push_undo(action)
-            print(Fore.GREEN + f"\nRedo: Re-added book {action['isbn']}")
+            echo(Fore.GREEN + f"\nRedo: Re-added book {action['isbn']}")
         elif action['type'] == 'remove':
             book_manager.remove_book(isbn=action['isbn'])
             self.push_undo(action)
-            print(Fore.GREEN + f"\nRedo: Removed book {action['isbn']}")
+            echo(Fore.GREEN + f"\nRedo: Removed book {action['isbn']}")
+        return action
 
 # ===============================================
 # Binary Tree-based Book Search (BST)
 # ===============================================
 class BSTNode:
-    def __init__(self, isbn, title, user, date): 
+    def __init__(self, isbn, title, user, date, epoch=0): 
         self.isbn = isbn
         self.title = title
         self.user = user
         self.date = date
         self.left = None
         self.right = None
+        self.epoch = epoch      # Write epoch the node was created in (see Copy-on-Write Snapshots)
 
-class BinarySearchTree(BookManagerBase):
+    def copy(self, epoch):
+        node = BSTNode(self.isbn, self.title, self.user, self.date, epoch)
+        node.left, node.right = self.left, self.right
+        return node
+
+class BinarySearchTree(CopyOnWriteTree):
     def __init__(self):
         self.root = None
         self.borrow_queue = {}
@@ -341,22 +674,27 @@ class BinarySearchTree(BookManagerBase):
 
     def _add_recursive(self, node, isbn, title, user, date):
         if not node:
-            return BSTNode(isbn, title, user, date)
+            self._publish("book_added", isbn, title, user, date)
+            return BSTNode(isbn, title, user, date, self.epoch)
+        node = self._writable(node)     # Path copying: the nodes on the way down are replaced by writable copies
         if isbn < node.isbn:
             node.left = self._add_recursive(node.left, isbn, title, user, date)
         elif isbn > node.isbn:
             node.right = self._add_recursive(node.right, isbn, title, user, date)
         else:
-            print(Fore.RED + "\nBook with this ISBN already exists.")
+            echo(Fore.RED + "\nBook with this ISBN already exists.")
         return node
 
     def remove_book(self, isbn=None):
         self.root, removed_book = self._delete_recursive(self.root, isbn)
+        if removed_book:
+            self._publish("book_removed", **removed_book)
         return removed_book
 
     def _delete_recursive(self, node, isbn):
         if not node:
             return node, None
+        node = self._writable(node)
         if isbn < node.isbn:
             node.left, removed_book = self._delete_recursive(node.left, isbn)
         elif isbn > node.isbn:
@@ -369,6 +707,7 @@ class BinarySearchTree(BookManagerBase):
                 return node.left, removed_book
             min_node = self._min_value_node(node.right)
             node.isbn, node.title = min_node.isbn, min_node.title
+            node.user, node.date = min_node.user, min_node.date      # Keep the successor's loan details too
             node.right, _ = self._delete_recursive(node.right, min_node.isbn)
         return node, removed_book
 
@@ -407,15 +746,19 @@ class BinarySearchTree(BookManagerBase):
                 return None
             if isbn == node.isbn:
                 if node.user == '':
+                    if node.epoch != self.epoch:
+                        node = self._writable_node(isbn)        # The node is shared with a snapshot
                     node.user = user
                     node.date = date
+                    self._publish("book_borrowed", node.isbn, node.title, user, date)
                     return True
                 else:
-                    if node.title in self.borrow_queue:
-                        self.borrow_queue[node.title].append({"user": user, "date": date})
+                    if node.isbn in self.borrow_queue:
+                        self.borrow_queue[node.isbn].append({"user": user, "date": date})
                     else:
-                        self.borrow_queue[node.title] = [{"user": user, "date": date}]
-                    print(Fore.GREEN + f"\nBook '{node.title}' is currently borrowed. {user}, you have been added to the waiting queue.")
+                        self.borrow_queue[node.isbn] = [{"user": user, "date": date}]
+                    echo(Fore.GREEN + f"\nBook '{node.title}' is currently borrowed. {user}, you have been added to the waiting queue.")
+                    self._publish("queue_joined", node.isbn, node.title, user, date)
                     return False
             elif isbn < node.isbn:
                 return _borrow_node(node.left, isbn)
@@ -429,14 +772,18 @@ class BinarySearchTree(BookManagerBase):
             if not node:
                 return False
             if isbn == node.isbn and node.user == user:
+                if node.epoch != self.epoch:
+                    node = self._writable_node(isbn)        # The node is shared with a snapshot
                 node.user = ''
                 node.date = ''
+                self._publish("book_returned", node.isbn, node.title, user)
                 # If there are users waiting in the queue, notify the next user
-                if node.title in self.borrow_queue and len(self.borrow_queue[node.title]) > 0:
-                    next_user = self.borrow_queue[node.title].pop(0)
-                    print(Fore.GREEN + f"\nBook '{node.title}' is now available for {next_user['user']}.")
+                next_user = self._next_borrower(node.isbn, user)
+                if next_user:
+                    echo(Fore.GREEN + f"\nBook '{node.title}' is now available for {next_user['user']}.")
                     node.user = next_user['user']
                     node.date = next_user['date']
+                    self._publish("queue_handoff", node.isbn, node.title, next_user['user'], next_user['date'])
                 return True
             elif isbn < node.isbn:
                 return _return_node(node.left, isbn)
@@ -449,7 +796,7 @@ class BinarySearchTree(BookManagerBase):
 # AVL Tree
 # =============================================== 
 class AVLNode:
-    def __init__(self, isbn, title, user, date): 
+    def __init__(self, isbn, title, user, date, epoch=0): 
         self.isbn = isbn
         self.title = title
         self.user = user
@@ -457,8 +804,14 @@ class AVLNode:
         self.left = None
         self.right = None
         self.height = 1   # Height property for balancing purposes
+        self.epoch = epoch      # Write epoch the node was created in (see Copy-on-Write Snapshots)
+
+    def copy(self, epoch):
+        node = AVLNode(self.isbn, self.title, self.user, self.date, epoch)
+        node.left, node.right, node.height = self.left, self.right, self.height
+        return node
 
-class AVLTree(BookManagerBase):
+class AVLTree(CopyOnWriteTree):
     def __init__(self):
         self.root = None
         self.borrow_queue = {}
@@ -477,7 +830,8 @@ class AVLTree(BookManagerBase):
 
     # Right rotate utility to maintain AVL property
     def _right_rotate(self, y):
-        x = y.left
+        y = self._writable(y)
+        x = self._writable(y.left)      # During delete rebalancing the rotated child can be off the copied path
         T2 = x.right
         x.right = y
         y.left = T2
@@ -487,7 +841,8 @@ class AVLTree(BookManagerBase):
 
     # Left rotate utility to maintain AVL property
     def _left_rotate(self, x):
-        y = x.right
+        x = self._writable(x)
+        y = self._writable(x.right)
         T2 = y.left
         y.left = x
         x.right = T2
@@ -501,13 +856,15 @@ class AVLTree(BookManagerBase):
 
     def _add_recursive(self, node, isbn, title, user, date):
         if not node:
-            return AVLNode(isbn, title, user, date)
+            self._publish("book_added", isbn, title, user, date)
+            return AVLNode(isbn, title, user, date, self.epoch)
+        node = self._writable(node)     # Path copying: the nodes on the way down are replaced by writable copies
         if isbn < node.isbn:
             node.left = self._add_recursive(node.left, isbn, title, user, date)
         elif isbn > node.isbn:
             node.right = self._add_recursive(node.right, isbn, title, user, date)
         else:
-            print(Fore.RED + "\nBook with this ISBN already exists.")
+            echo(Fore.RED + "\nBook with this ISBN already exists.")
             return node
 
         node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
@@ -538,11 +895,14 @@ class AVLTree(BookManagerBase):
     # Function to remove a book and maintain AVL balance
     def remove_book(self, isbn=None):
         self.root, removed_book = self._delete_recursive(self.root, isbn)
+        if removed_book:
+            self._publish("book_removed", **removed_book)
         return removed_book
 
     def _delete_recursive(self, node, isbn):
         if not node:
             return node, None
+        node = self._writable(node)
         if isbn < node.isbn:
             node.left, removed_book = self._delete_recursive(node.left, isbn)
         elif isbn > node.isbn:
@@ -555,7 +915,35 @@ class AVLTree(BookManagerBase):
                 return node.left, removed_book
             min_node = self._min_value_node(node.right)
             node.isbn, node.title = min_node.isbn, min_node.title
+            node.user, node.date = min_node.user, min_node.date      # Keep the successor's loan details too
             node.right, _ = self._delete_recursive(node.right, min_node.isbn)
+
+        if not removed_book:
+            return node, None
+
+        node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
+
+        # Rebalance on the way back up, the same four cases as insertion (decided by the child's balance)
+        balance = self._get_balance(node)
+
+        # Left heavy situation - Right rotation
+        if balance > 1 and self._get_balance(node.left) >= 0:
+            return self._right_rotate(node), removed_book
+
+        # Left-Right case - Left rotation followed by Right rotation
+        if balance > 1:
+            node.left = self._left_rotate(node.left)
+            return self._right_rotate(node), removed_book
+
+        # Right heavy situation - Left rotation
+        if balance < -1 and self._get_balance(node.right) <= 0:
+            return self._left_rotate(node), removed_book
+
+        # Right-Left case - Right rotation followed by Left rotation
+        if balance < -1:
+            node.right = self._right_rotate(node.right)
+            return self._left_rotate(node), removed_book
+
         return node, removed_book
 
     # Helper function to find the node with the smallest value in the right subtree
@@ -596,15 +984,19 @@ class AVLTree(BookManagerBase):
                 return None
             if isbn == node.isbn:
                 if node.user == '':
+                    if node.epoch != self.epoch:
+                        node = self._writable_node(isbn)        # The node is shared with a snapshot
                     node.user = user
                     node.date = date
+                    self._publish("book_borrowed", node.isbn, node.title, user, date)
                     return True
                 else:
-                    if node.title in self.borrow_queue:
-                        self.borrow_queue[node.title].append({"user": user, "date": date})
+                    if node.isbn in self.borrow_queue:
+                        self.borrow_queue[node.isbn].append({"user": user, "date": date})
                     else:
-                        self.borrow_queue[node.title] = [{"user": user, "date": date}]
-                    print(Fore.GREEN + f"Book '{node.title}' is currently borrowed. {user}, you have been added to the waiting queue.")
+                        self.borrow_queue[node.isbn] = [{"user": user, "date": date}]
+                    echo(Fore.GREEN + f"Book '{node.title}' is currently borrowed. {user}, you have been added to the waiting queue.")
+                    self._publish("queue_joined", node.isbn, node.title, user, date)
                     return False
             elif isbn < node.isbn:
                 return _borrow_node(node.left, isbn)
@@ -618,14 +1010,18 @@ class AVLTree(BookManagerBase):
             if not node:
                 return False
             if isbn == node.isbn and node.user == user:
+                if node.epoch != self.epoch:
+                    node = self._writable_node(isbn)        # The node is shared with a snapshot
                 node.user = ''
                 node.date = ''
+                self._publish("book_returned", node.isbn, node.title, user)
                 # Notify the next user in the queue if any
-                if node.title in self.borrow_queue and len(self.borrow_queue[node.title]) > 0:
-                    next_user = self.borrow_queue[node.title].pop(0)
-                    print(Fore.GREEN + f"Book '{node.title}' is now available for {next_user['user']}.")
+                next_user = self._next_borrower(node.isbn, user)
+                if next_user:
+                    echo(Fore.GREEN + f"Book '{node.title}' is now available for {next_user['user']}.")
                     node.user = next_user['user']
                     node.date = next_user['date']
+                    self._publish("queue_handoff", node.isbn, node.title, next_user['user'], next_user['date'])
                 return True
             elif isbn < node.isbn:
                 return _return_node(node.left, isbn)
@@ -634,6 +1030,925 @@ class AVLTree(BookManagerBase):
 
         return _return_node(self.root, isbn)
     
+# ===============================================
+# B+ Tree (Array-backed nodes)
+# ===============================================
+# Each node stores its entries in plain Python lists instead of one object per book, so a lookup
+# only touches one node per level and full scans walk the leaf arrays from left to right.
+# Leaves are not linked to each other: a copied leaf would leave its neighbour pointing at the old version,
+# so scans reach the leaves through their parents instead (see Copy-on-Write Snapshots).
+class BPlusLeaf:
+    __slots__ = ("keys", "titles", "users", "dates", "epoch")
+
+    def __init__(self, epoch=0):
+        self.keys = []      # Sorted ISBNs
+        self.titles = []    # Book details are kept in parallel arrays, indexed the same as keys
+        self.users = []
+        self.dates = []
+        self.epoch = epoch      # Write epoch the node was created in
+
+    def copy(self, epoch):
+        leaf = BPlusLeaf(epoch)
+        leaf.keys, leaf.titles, leaf.users, leaf.dates = self.keys[:], self.titles[:], self.users[:], self.dates[:]
+        return leaf
+
+class BPlusInternal:
+    __slots__ = ("keys", "children", "epoch")
+
+    def __init__(self, epoch=0):
+        self.keys = []          # Separator keys. children[i] holds ISBNs < keys[i], children[i+1] holds ISBNs >= keys[i]
+        self.children = []
+        self.epoch = epoch
+
+    def copy(self, epoch):
+        node = BPlusInternal(epoch)
+        node.keys, node.children = self.keys[:], self.children[:]
+        return node
+
+class BPlusTree(CopyOnWriteTree):
+    def __init__(self, order=32):       # order: maximum number of keys per node (fan-out)
+        if order < 3:
+            raise ValueError("B+ tree order must be at least 3.")
+        self.order = order
+        self.min_keys = order // 2      # Minimum number of keys per node (except the root)
+        self.root = BPlusLeaf()
+        self.borrow_queue = {}
+
+    # Utility function to walk down from the root to the leaf that should hold the ISBN
+    def _find_leaf(self, isbn):
+        node = self.root
+        while isinstance(node, BPlusInternal):
+            node = node.children[bisect_right(node.keys, isbn)]
+        return node
+
+    # Utility function to locate a book, returns (leaf, index) or (None, None)
+    def _locate(self, isbn=None, title=None):
+        if isbn:
+            leaf = self._find_leaf(isbn)
+            i = bisect_left(leaf.keys, isbn)
+            if i < len(leaf.keys) and leaf.keys[i] == isbn:
+                return leaf, i
+        elif title:
+            title = title.lower()
+            for leaf in self._leaves():
+                for i, leaf_title in enumerate(leaf.titles):
+                    if leaf_title.lower() == title:
+                        return leaf, i
+        return None, None
+
+    def _leaves(self, root=None):       # Yields the leaves under root (default: the current root) in ISBN order
+        stack = [self.root if root is None else root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, BPlusLeaf):
+                yield node
+            else:
+                stack.extend(reversed(node.children))
+
+    def _writable_leaf(self, isbn):     # Copies the path from the root to the ISBN's leaf and returns the leaf
+        self.root = node = self._writable(self.root)
+        while isinstance(node, BPlusInternal):
+            i = bisect_right(node.keys, isbn)
+            node.children[i] = self._writable(node.children[i])
+            node = node.children[i]
+        return node
+
+    def _book(self, leaf, i):
+        return {"isbn": leaf.keys[i], "title": leaf.titles[i], "user": leaf.users[i], "date": leaf.dates[i]}
+
+    # Function to add a book, splitting full nodes on the way back up
+    def add_book(self, isbn, title, user='', date=''):
+        self.root = self._writable(self.root)
+        split = self._add_recursive(self.root, isbn, title, user, date)
+        if split:       # The root was split, grow the tree by one level
+            separator, right = split
+            new_root = BPlusInternal(self.epoch)
+            new_root.keys = [separator]
+            new_root.children = [self.root, right]
+            self.root = new_root
+
+    def _add_recursive(self, node, isbn, title, user, date):
+        if isinstance(node, BPlusLeaf):
+            i = bisect_left(node.keys, isbn)
+            if i < len(node.keys) and node.keys[i] == isbn:
+                echo(Fore.RED + "\nBook with this ISBN already exists.")
+                return None
+            node.keys.insert(i, isbn)
+            node.titles.insert(i, title)
+            node.users.insert(i, user)
+            node.dates.insert(i, date)
+            self._publish("book_added", isbn, title, user, date)
+            if len(node.keys) > self.order:
+                return self._split_leaf(node)
+            return None
+
+        i = bisect_right(node.keys, isbn)
+        node.children[i] = self._writable(node.children[i])       # Path copying: node itself was made writable by the caller
+        split = self._add_recursive(node.children[i], isbn, title, user, date)
+        if split:
+            separator, right = split
+            node.keys.insert(i, separator)
+            node.children.insert(i + 1, right)
+            if len(node.keys) > self.order:
+                return self._split_internal(node)
+        return None
+
+    def _split_leaf(self, leaf):
+        mid = len(leaf.keys) // 2
+        right = BPlusLeaf(self.epoch)
+        right.keys, leaf.keys = leaf.keys[mid:], leaf.keys[:mid]
+        right.titles, leaf.titles = leaf.titles[mid:], leaf.titles[:mid]
+        right.users, leaf.users = leaf.users[mid:], leaf.users[:mid]
+        right.dates, leaf.dates = leaf.dates[mid:], leaf.dates[:mid]
+        return right.keys[0], right
+
+    def _split_internal(self, node):
+        mid = len(node.keys) // 2
+        right = BPlusInternal(self.epoch)
+        separator = node.keys[mid]
+        right.keys, node.keys = node.keys[mid + 1:], node.keys[:mid]
+        right.children, node.children = node.children[mid + 1:], node.children[:mid + 1]
+        return separator, right
+
+    # Function to remove a book by ISBN (or title), merging or borrowing from siblings on underflow
+    def remove_book(self, isbn=None, title=None):
+        if not isbn:
+            leaf, i = self._locate(title=title)
+            if leaf is None:
+                return None
+            isbn = leaf.keys[i]
+        self.root = self._writable(self.root)
+        removed_book = self._delete_recursive(self.root, isbn)
+        if isinstance(self.root, BPlusInternal) and len(self.root.children) == 1:
+            self.root = self.root.children[0]       # Shrink the tree when the root has a single child
+        if removed_book:
+            self._publish("book_removed", **removed_book)
+        return removed_book
+
+    def _delete_recursive(self, node, isbn):
+        if isinstance(node, BPlusLeaf):
+            i = bisect_left(node.keys, isbn)
+            if i == len(node.keys) or node.keys[i] != isbn:
+                return None
+            removed_book = self._book(node, i)
+            del node.keys[i], node.titles[i], node.users[i], node.dates[i]
+            return removed_book
+
+        i = bisect_right(node.keys, isbn)
+        node.children[i] = self._writable(node.children[i])
+        removed_book = self._delete_recursive(node.children[i], isbn)
+        if removed_book and len(node.children[i].keys) < self.min_keys:
+            self._rebalance(node, i)
+        return removed_book
+
+    def _rebalance(self, parent, i):
+        child = parent.children[i]
+        left = parent.children[i - 1] if i > 0 else None
+        right = parent.children[i + 1] if i + 1 < len(parent.children) else None
+        # The child is already writable. A sibling is copied before it gives up or takes in keys.
+        if left and len(left.keys) > self.min_keys:
+            parent.children[i - 1] = left = self._writable(left)
+            self._borrow_from_left(parent, i, left, child)
+        elif right and len(right.keys) > self.min_keys:
+            parent.children[i + 1] = right = self._writable(right)
+            self._borrow_from_right(parent, i, child, right)
+        elif left:
+            parent.children[i - 1] = left = self._writable(left)
+            self._merge(parent, i - 1, left, child)
+        elif right:
+            self._merge(parent, i, child, right)
+
+    def _borrow_from_left(self, parent, i, left, child):
+        if isinstance(child, BPlusLeaf):
+            child.keys.insert(0, left.keys.pop())
+            child.titles.insert(0, left.titles.pop())
+            child.users.insert(0, left.users.pop())
+            child.dates.insert(0, left.dates.pop())
+            parent.keys[i - 1] = child.keys[0]
+        else:
+            child.keys.insert(0, parent.keys[i - 1])
+            child.children.insert(0, left.children.pop())
+            parent.keys[i - 1] = left.keys.pop()
+
+    def _borrow_from_right(self, parent, i, child, right):
+        if isinstance(child, BPlusLeaf):
+            child.keys.append(right.keys.pop(0))
+            child.titles.append(right.titles.pop(0))
+            child.users.append(right.users.pop(0))
+            child.dates.append(right.dates.pop(0))
+            parent.keys[i] = right.keys[0]
+        else:
+            child.keys.append(parent.keys[i])
+            child.children.append(right.children.pop(0))
+            parent.keys[i] = right.keys.pop(0)
+
+    def _merge(self, parent, i, left, right):      # Merge parent.children[i+1] (right) into parent.children[i] (left)
+        if isinstance(left, BPlusLeaf):
+            left.keys.extend(right.keys)
+            left.titles.extend(right.titles)
+            left.users.extend(right.users)
+            left.dates.extend(right.dates)
+        else:
+            left.keys.append(parent.keys[i])
+            left.keys.extend(right.keys)
+            left.children.extend(right.children)
+        del parent.keys[i]
+        del parent.children[i + 1]
+
+    # Function to search for a book by ISBN (tree lookup) or by title (leaf scan)
+    def search_book(self, isbn=None, title=None):
+        leaf, i = self._locate(isbn, title)
+        if leaf is None:
+            return None
+        return self._book(leaf, i)
+
+    # Sequential scans walk the leaf arrays from left to right
+    def get_books(self):
+        return list(self.iter_books())
+
+    def _iter_nodes(self, root):
+        for leaf in self._leaves(root):
+            for i in range(len(leaf.keys)):
+                yield self._book(leaf, i)
+
+    def display_books(self):
+        empty = True
+        for leaf in self._leaves():
+            for isbn, title in zip(leaf.keys, leaf.titles):
+                empty = False
+                echo(Fore.GREEN + f"{isbn}\t|\t{title}")
+        if empty:
+            echo(Fore.RED + "\nNo books available.")
+
+    def get_borrowed_books(self):
+        borrowed_books = []
+        for leaf in self._leaves():
+            for i, user in enumerate(leaf.users):
+                if user != '' and leaf.dates[i] != '':
+                    borrowed_books.append(self._book(leaf, i))
+        return borrowed_books
+
+    def borrow_book_sub(self, book=None, user=None, date=None):
+        leaf, i = self._locate(isbn=book['isbn'])
+        if leaf is None:
+            return None
+        if leaf.users[i] == '':
+            if leaf.epoch != self.epoch:
+                leaf = self._writable_leaf(book['isbn'])        # The leaf is shared with a snapshot
+            leaf.users[i] = user
+            leaf.dates[i] = date
+            self._publish("book_borrowed", leaf.keys[i], leaf.titles[i], user, date)
+            return True
+        title = leaf.titles[i]
+        if book['isbn'] in self.borrow_queue:
+            self.borrow_queue[book['isbn']].append({"user": user, "date": date})
+        else:
+            self.borrow_queue[book['isbn']] = [{"user": user, "date": date}]
+        echo(Fore.GREEN + f"\nBook '{title}' is currently borrowed. {user}, you have been added to the waiting queue.")
+        self._publish("queue_joined", book['isbn'], title, user, date)
+        return False
+
+    def return_book(self, isbn=None, user=None):
+        leaf, i = self._locate(isbn=isbn)
+        if leaf is None or leaf.users[i] != user:
+            return False
+        if leaf.epoch != self.epoch:
+            leaf = self._writable_leaf(isbn)        # The leaf is shared with a snapshot
+        leaf.users[i] = ''
+        leaf.dates[i] = ''
+        # If there are users waiting in the queue, notify the next user
+        title = leaf.titles[i]
+        self._publish("book_returned", isbn, title, user)
+        next_user = self._next_borrower(isbn, user)
+        if next_user:
+            echo(Fore.GREEN + f"\nBook '{title}' is now available for {next_user['user']}.")
+            leaf.users[i] = next_user['user']
+            leaf.dates[i] = next_user['date']
+            self._publish("queue_handoff", isbn, title, next_user['user'], next_user['date'])
+        return True
+
+# ===============================================
+# SQLite Storage Engine (On-disk catalog with indexed ISBN/title/user columns)
+# ===============================================
+class SQLiteBookManager(BookManagerBase):
+    # SQL statements are kept as constants so sqlite3 can reuse its prepared statement for each of them
+    CREATE_TABLE = "CREATE TABLE IF NOT EXISTS books (isbn TEXT PRIMARY KEY, title TEXT NOT NULL, user TEXT NOT NULL DEFAULT '', date TEXT NOT NULL DEFAULT '')"
+    CREATE_TITLE_INDEX = "CREATE INDEX IF NOT EXISTS idx_books_title ON books (title COLLATE NOCASE)"
+    CREATE_USER_INDEX = "CREATE INDEX IF NOT EXISTS idx_books_user ON books (user)"
+    SELECT_BY_ISBN = "SELECT isbn, title, user, date FROM books WHERE isbn = ?"
+    SELECT_BY_TITLE = "SELECT isbn, title, user, date FROM books WHERE title = ? COLLATE NOCASE LIMIT 1"
+    SELECT_ALL = "SELECT isbn, title, user, date FROM books ORDER BY isbn"
+    SELECT_BORROWED = "SELECT isbn, title, user, date FROM books WHERE user != '' AND date != '' ORDER BY isbn"
+    SELECT_USER_BORROWED = "SELECT isbn, title, user, date FROM books WHERE user = ? AND date != '' ORDER BY isbn"
+    INSERT = "INSERT INTO books (isbn, title, user, date) VALUES (?, ?, ?, ?)"
+    INSERT_IGNORE = "INSERT OR IGNORE INTO books (isbn, title, user, date) VALUES (?, ?, ?, ?)"
+    DELETE = "DELETE FROM books WHERE isbn = ?"
+    BORROW = "UPDATE books SET user = ?, date = ? WHERE isbn = ? AND user = ''"
+    RETURN = "UPDATE books SET user = '', date = '' WHERE isbn = ? AND user = ?"
+    ASSIGN = "UPDATE books SET user = ?, date = ? WHERE isbn = ?"
+
+    def __init__(self, filename="books.db"):
+        import sqlite3      # Loaded only when the SQLite storage engine is chosen
+        self.filename = filename
+        # isolation_level=None: transactions are opened explicitly in transaction(), so several operations can share one commit
+        self.connection = sqlite3.connect(filename, isolation_level=None, check_same_thread=False)
+        self.connection.row_factory = lambda cursor, row: {"isbn": row[0], "title": row[1], "user": row[2], "date": row[3]}
+        self.connection.execute("PRAGMA journal_mode=WAL")      # Readers don't block the writer, and commits only append to the log
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(self.CREATE_TABLE)
+        self.connection.execute(self.CREATE_TITLE_INDEX)
+        self.connection.execute(self.CREATE_USER_INDEX)
+        self.borrow_queue = {}
+        self._transaction_depth = 0
+
+    @contextmanager
+    def transaction(self):      # Groups every statement inside the with-block into one transaction
+        # Nested blocks join the outer transaction through a savepoint, so a failing inner block only undoes its own changes
+        savepoint = f"level{self._transaction_depth}"
+        self.connection.execute("BEGIN" if self._transaction_depth == 0 else "SAVEPOINT " + savepoint)
+        self._transaction_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.connection.execute("ROLLBACK")
+            else:
+                self.connection.execute("ROLLBACK TO " + savepoint)
+                self.connection.execute("RELEASE " + savepoint)
+            raise
+        self._transaction_depth -= 1
+        self.connection.execute("COMMIT" if self._transaction_depth == 0 else "RELEASE " + savepoint)
+
+    def close(self):
+        self.connection.close()
+
+    def is_empty(self):
+        return self.connection.execute("SELECT isbn, title, user, date FROM books LIMIT 1").fetchone() is None
+
+    def import_csv(self, filename="books.csv"):
+        try:
+            with open(filename, mode='r') as file, self.transaction():
+                reader = csv.DictReader(file)
+                # Rows are streamed from the file straight into one batched insert
+                self.connection.executemany(self.INSERT_IGNORE, ((row['isbn'], row['title'], row.get('user') or '', row.get('date') or '') for row in reader))
+            echo(Fore.GREEN + "\nBooks imported from CSV into the database.")
+        except FileNotFoundError:
+            echo(Fore.RED + "\nCSV file not found.")
+
+    def export_csv(self, filename="books.csv"):
+        with self.snapshot() as snapshot:
+            CSVManager(filename).save_books(snapshot)
+
+    def snapshot(self):     # WAL mode already keeps old versions for readers: a read transaction on a second connection pins one
+        import sqlite3
+        if self.filename == ":memory:" or self._transaction_depth:
+            # An in-memory database can't be opened twice, and a second connection would not see an open transaction's
+            # changes, so both fall back to a copy
+            return super().snapshot()
+        connection = sqlite3.connect(self.filename, isolation_level=None, check_same_thread=False)
+        connection.row_factory = self.connection.row_factory
+        connection.execute("BEGIN")
+        connection.execute(self.SELECT_ALL).fetchone()      # The first read fixes the version the transaction sees
+        return BookSnapshot(self._iter_snapshot, connection, connection.close)
+
+    def _iter_snapshot(self, connection):
+        return connection.execute(self.SELECT_ALL)
+
+    def add_book(self, isbn, title, user='', date=''):
+        import sqlite3
+        try:
+            with self.transaction():
+                self.connection.execute(self.INSERT, (isbn, title, user, date))
+        except sqlite3.IntegrityError:
+            echo(Fore.RED + "\nBook with this ISBN already exists.")
+            return
+        self._publish("book_added", isbn, title, user, date)
+
+    def remove_book(self, isbn=None, title=None):
+        with self.transaction():
+            removed_book = self.search_book(isbn, title)
+            if removed_book:
+                self.connection.execute(self.DELETE, (removed_book['isbn'],))
+        if removed_book:
+            self._publish("book_removed", **removed_book)
+        return removed_book
+
+    def search_book(self, isbn=None, title=None):
+        if isbn:
+            return self.connection.execute(self.SELECT_BY_ISBN, (isbn,)).fetchone()
+        if title:
+            return self.connection.execute(self.SELECT_BY_TITLE, (title,)).fetchone()
+        return None
+
+    # Scans iterate the cursor, so rows are paged in from disk as they are needed
+    def get_books(self):
+        return self.connection.execute(self.SELECT_ALL).fetchall()
+
+    def iter_books(self):
+        return self.connection.execute(self.SELECT_ALL)
+
+    def display_books(self):
+        empty = True
+        for book in self.connection.execute(self.SELECT_ALL):
+            empty = False
+            echo(Fore.GREEN + f"{book['isbn']}\t|\t{book['title']}")
+        if empty:
+            echo(Fore.RED + "\nNo books available.")
+
+    def get_borrowed_books(self):
+        return self.connection.execute(self.SELECT_BORROWED).fetchall()
+
+    def get_user_borrowed_books(self, user=None):
+        return self.connection.execute(self.SELECT_USER_BORROWED, (user,)).fetchall()
+
+    def borrow_book_sub(self, book=None, user=None, date=None):
+        with self.transaction():
+            if self.connection.execute(self.BORROW, (user, date, book['isbn'])).rowcount == 1:
+                self._publish("book_borrowed", book['isbn'], book['title'], user, date)
+                return True
+            current = self.search_book(isbn=book['isbn'])
+        if not current:
+            return None
+        title = current['title']
+        if book['isbn'] in self.borrow_queue:
+            self.borrow_queue[book['isbn']].append({"user": user, "date": date})
+        else:
+            self.borrow_queue[book['isbn']] = [{"user": user, "date": date}]
+        echo(Fore.GREEN + f"\nBook '{title}' is currently borrowed. {user}, you have been added to the waiting queue.")
+        self._publish("queue_joined", book['isbn'], title, user, date)
+        return False
+
+    def return_book(self, isbn=None, user=None):
+        with self.transaction():        # The return and the hand-off to the next user are committed together
+            if self.connection.execute(self.RETURN, (isbn, user)).rowcount != 1:
+                return False        # Book not found or not borrowed by the given user
+            title = self.search_book(isbn=isbn)['title']
+            self._publish("book_returned", isbn, title, user)
+            next_user = self._next_borrower(isbn, user)
+            if next_user:
+                echo(Fore.GREEN + f"\nBook '{title}' is now available for {next_user['user']}.")
+                self.connection.execute(self.ASSIGN, (next_user['user'], next_user['date'], isbn))
+                self._publish("queue_handoff", isbn, title, next_user['user'], next_user['date'])
+        return True
+
+# ===============================================
+# Change Data Capture (Sequence-numbered events for every catalog change)
+# ===============================================
+class CatalogEvent:
+    TYPES = ("book_added", "book_removed", "book_borrowed", "book_returned", "queue_joined", "queue_handoff", "queue_expired")
+    __slots__ = ("seq", "type", "isbn", "title", "user", "date", "timestamp")
+
+    def __init__(self, seq, event_type, isbn, title, user='', date=''):
+        self.seq = seq              # Increases by one per event, so consumers can detect gaps and resume
+        self.type = event_type
+        self.isbn = isbn
+        self.title = title
+        self.user = user
+        self.date = date
+        self.timestamp = datetime.now().isoformat(timespec='seconds')
+
+    def to_dict(self):
+        return {"seq": self.seq, "type": self.type, "isbn": self.isbn, "title": self.title, "user": self.user, "date": self.date, "timestamp": self.timestamp}
+
+    def __repr__(self):
+        return f"CatalogEvent({self.to_dict()})"
+
+class ChangeEventBus:
+    # Listeners are plain callables taking a CatalogEvent. They are called synchronously, in subscription order,
+    # while the operation that caused the change is running.
+    def __init__(self):
+        self.seq = 0
+        self.listeners = []
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def publish(self, event_type, isbn, title, user='', date=''):
+        if event_type not in CatalogEvent.TYPES:
+            raise ValueError(f"Unknown event type: {event_type}")
+        self.seq += 1
+        event = CatalogEvent(self.seq, event_type, isbn, title, user, date)
+        for listener in self.listeners:
+            listener(event)
+        return event
+
+    def flush(self):        # Pushes out whatever the sinks have batched so far
+        for listener in self.listeners:
+            if isinstance(listener, EventSink):
+                listener.flush()
+
+    def close(self):
+        for listener in self.listeners:
+            if isinstance(listener, EventSink):
+                listener.close()
+
+class EventSink:
+    # Collects events as JSON lines and writes them in batches. When a batch is full the publishing call
+    # blocks until it has been written, so a slow consumer slows the producer down instead of growing the buffer.
+    def __init__(self, batch_size=100):
+        self.batch_size = batch_size
+        self.pending = []
+
+    def __call__(self, event):
+        import json
+        self.pending.append(json.dumps(event.to_dict()) + "\n")
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            data, self.pending = "".join(self.pending), []
+            self._write(data)
+
+    def _write(self, data):     # Placeholder method to be overridden by subclasses
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+class FileEventSink(EventSink):     # Appends events to a local JSON lines file
+    def __init__(self, filename="events.jsonl", batch_size=100):
+        super().__init__(batch_size)
+        self.file = open(filename, mode='a', encoding='utf-8')
+
+    def _write(self, data):
+        self.file.write(data)
+        self.file.flush()
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+class SocketEventSink(EventSink):   # Streams events as JSON lines to a local TCP listener
+    def __init__(self, host="127.0.0.1", port=9009, batch_size=100, timeout=5.0):
+        import socket       # Loaded only when events are streamed to a socket
+        super().__init__(batch_size)
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+
+    def _write(self, data):
+        self.sock.sendall(data.encode('utf-8'))     # Blocks while the consumer's receive buffer is full
+
+    def close(self):
+        super().close()
+        self.sock.close()
+
+# ===============================================
+# Hierarchical Timing Wheel (Due-date reminders, overdue and reservation expiry events)
+# ===============================================
+class TimerEntry:
+    __slots__ = ("due", "event", "cancelled")
+
+    def __init__(self, due, event):
+        self.due = due              # Day (date ordinal) on which the event fires
+        self.event = event          # Event dictionary handed back by advance_to()
+        self.cancelled = False      # Cancelled entries are skipped when their slot comes up (no searching the wheel)
+
+class DueDateScheduler:
+    # Time is counted in whole days. Level 0 has one slot per day, each higher level has slots that are
+    # wheel_size times wider. Scheduling and cancelling are O(1); an entry is moved down at most once per level.
+    def __init__(self, book_manager, days_due=14, reminder_days=2, hold_days=7, start_date=None, wheel_size=64, levels=3):
+        self.book_manager = book_manager
+        self.days_due = days_due                # A book is overdue once more than days_due days have passed since borrowing
+        self.reminder_days = reminder_days      # Reminder is sent this many days before the due date
+        self.hold_days = hold_days              # The first waiting reservation expires this many days after the copy became available to it
+        self.wheel_size = wheel_size
+        self.levels = levels
+        self.wheels = [[[] for _ in range(wheel_size)] for _ in range(levels)]
+        self.now = (start_date or datetime.today()).toordinal()
+        self.ready = []         # Entries that were already due when they were scheduled
+        self.loans = {}         # isbn -> list of TimerEntry for the current loan
+        self.holds = {}         # id(queue entry) -> TimerEntry for the first waiting reservation of each book
+
+    # Utility function to place an entry in the wheel level that covers its delay
+    def _insert(self, entry):
+        delay = entry.due - self.now
+        if delay <= 0:
+            self.ready.append(entry)
+            return
+        for level in range(self.levels):
+            if delay < self.wheel_size ** (level + 1):
+                slot = (entry.due // self.wheel_size ** level) % self.wheel_size
+                self.wheels[level][slot].append(entry)
+                return
+        # Further away than the wheel covers: park it in the last top-level slot, it is re-inserted when that slot comes up
+        # (with a single level that slot fires directly, so _fire re-inserts entries that are not due yet)
+        top = self.levels - 1
+        slot = (self.now // self.wheel_size ** top + self.wheel_size - 1) % self.wheel_size
+        self.wheels[top][slot].append(entry)
+
+    def _schedule(self, due, event):
+        entry = TimerEntry(due, event)
+        self._insert(entry)
+        return entry
+
+    def schedule_loan(self, isbn, title, user, date, announce_overdue=True):
+        self.cancel_loan(isbn)
+        borrowed = datetime.strptime(date, '%Y-%m-%d').toordinal()
+        event = {"isbn": isbn, "title": title, "user": user, "date": date}
+        overdue_day = borrowed + self.days_due + 1
+        self.loans[isbn] = [self._schedule(overdue_day, dict(event, type="overdue"))]
+        if overdue_day > self.now:      # No reminder for a loan that is already overdue
+            self.loans[isbn].insert(0, self._schedule(overdue_day - 1 - self.reminder_days, dict(event, type="reminder_due")))
+        elif not announce_overdue:      # Already overdue: keep the entry for refresh_book, but don't fire it
+            self.loans[isbn][0].cancelled = True
+
+    def cancel_loan(self, isbn):
+        for entry in self.loans.pop(isbn, []):
+            entry.cancelled = True
+
+    def schedule_hold(self, isbn, title, queue_entry, start):      # The hold runs for hold_days from start (date ordinal)
+        if id(queue_entry) in self.holds or not queue_entry.get('date'):
+            return
+        start = max(start, datetime.strptime(queue_entry['date'], '%Y-%m-%d').toordinal())
+        event = {"type": "hold_expired", "isbn": isbn, "title": title, "user": queue_entry['user'], "date": queue_entry['date'], "entry": queue_entry}
+        self.holds[id(queue_entry)] = self._schedule(start + self.hold_days, event)
+
+    def _schedule_front_hold(self, book):
+        # Only the reservation at the front of the line (index 1, index 0 is the last borrower) is on the clock, and only
+        # while the copy is actually available to it. A copy that is still on loan (overdue or not) doesn't use up the hold.
+        queue = self.book_manager.borrow_queue.get(book['isbn'], [])
+        if book['user'] != '':
+            for queue_entry in queue:
+                hold = self.holds.pop(id(queue_entry), None)
+                if hold:
+                    hold.cancelled = True
+            return
+        if len(queue) >= 2:
+            self.schedule_hold(book['isbn'], book['title'], queue[1], self.now)
+
+    def refresh_book(self, isbn):       # Re-reads one book (and its reservation queue) after it was borrowed, returned or removed
+        book = self.book_manager.search_book(isbn=isbn)
+        if not book:
+            self.cancel_loan(isbn)
+            return
+        if book['user'] != '' and book['date'] != '':
+            loan = self.loans.get(isbn)
+            if not loan or loan[0].event['user'] != book['user'] or loan[0].event['date'] != book['date']:
+                self.schedule_loan(book['isbn'], book['title'], book['user'], book['date'])
+        else:
+            self.cancel_loan(isbn)
+        self._schedule_front_hold(book)
+
+    def handle_event(self, event):      # ChangeEventBus listener: keeps the wheel in step with borrows, returns and removals
+        if event.type in ("book_added", "book_borrowed", "book_returned", "book_removed", "queue_joined", "queue_handoff"):
+            self.refresh_book(event.isbn)
+
+    def load(self):     # Schedules every loan and the first waiting reservation of each book once at start-up
+        # Loans that are already overdue at start-up are listed by the overdue report instead of firing again at every start
+        for book in self.book_manager.get_borrowed_books():
+            self.schedule_loan(book['isbn'], book['title'], book['user'], book['date'], announce_overdue=False)
+        for isbn in list(self.book_manager.borrow_queue):
+            book = self.book_manager.search_book(isbn=isbn)
+            if book:
+                self._schedule_front_hold(book)
+
+    def advance(self, days=1):
+        return self.advance_to(datetime.fromordinal(self.now + days))
+
+    def advance_to(self, date):     # Moves the clock forward (in bulk if needed) and returns the events that fired, in order
+        target = date.toordinal()
+        fired = []
+        due, self.ready = self.ready, []
+        for entry in due:
+            self._fire(entry, fired)
+        while self.now < target:
+            self.now += 1
+            # Cascade: when a lower level wraps around, the matching slot of the next level is spread over the lower levels
+            for level in range(1, self.levels):
+                if self.now % self.wheel_size ** level != 0:
+                    break
+                slot = (self.now // self.wheel_size ** level) % self.wheel_size
+                entries, self.wheels[level][slot] = self.wheels[level][slot], []
+                for entry in entries:
+                    if not entry.cancelled:
+                        self._insert(entry)
+            due, self.ready = self.ready, []
+            slot = self.now % self.wheel_size
+            due.extend(self.wheels[0][slot])
+            self.wheels[0][slot] = []
+            for entry in due:
+                self._fire(entry, fired)
+        return fired
+
+    def _fire(self, entry, fired):
+        if entry.cancelled:
+            return
+        if entry.due > self.now:        # Parked beyond the wheel's range and not due yet
+            self._insert(entry)
+            return
+        event = entry.event
+        if event['type'] == "hold_expired":
+            del self.holds[id(event['entry'])]
+            queue = self.book_manager.borrow_queue.get(event['isbn'], [])
+            for i in range(1, len(queue)):      # Only drop the reservation if it is still waiting in the queue
+                if queue[i] is event['entry']:
+                    del queue[i]
+                    self.book_manager._publish("queue_expired", event['isbn'], event['title'], event['user'], event['date'])
+                    fired.append(event)
+                    book = self.book_manager.search_book(isbn=event['isbn'])
+                    if book:
+                        self._schedule_front_hold(book)     # The next reservation is now at the front
+                    break
+            return
+        fired.append(event)
+
+    def display_events(self, events):
+        for event in events:
+            if event['type'] == "reminder_due":
+                echo(Fore.YELLOW + f"\nReminder: '{event['title']}' borrowed by {event['user']} on {event['date']} is due in {self.reminder_days} days.")
+            elif event['type'] == "overdue":
+                echo(Fore.RED + f"\nOverdue: '{event['title']}' borrowed by {event['user']} on {event['date']} is now overdue.")
+            elif event['type'] == "hold_expired":
+                echo(Fore.RED + f"\nReservation expired: {event['user']}'s reservation for '{event['title']}' (made on {event['date']}) was removed from the queue.")
+
+# ===============================================
+# Loan History (Append-only columnar store with analytics reports)
+# ===============================================
+class LoanHistory:
+    # One row per loan, stored column by column in typed arrays. ISBNs and usernames are stored once
+    # and referenced by id, so a row costs 20 bytes. Reports are single passes over the columns they need.
+    def __init__(self, filename="loans.dat"):
+        self.filename = filename
+        self.isbns = []         # Book id -> ISBN
+        self.titles = []        # Book id -> title
+        self.users = []         # User id -> username
+        self._isbn_ids = {}
+        self._user_ids = {}
+        self.book = array('i')          # Columns, one entry per loan
+        self.user = array('i')
+        self.borrowed = array('i')      # Date ordinals
+        self.returned = array('i')      # 0 while the book is still on loan
+        self.wait = array('i')          # Days spent in the reservation queue, -1 if the book was borrowed directly
+        self.in_order = True            # True while rows were appended in borrow-date order (lets date ranges use bisect)
+        self.open_loans = {}            # isbn -> row of the loan in progress
+        self.waiting = {}               # (isbn, user) -> date ordinal the user joined the queue
+
+    def _columns(self):
+        return (self.book, self.user, self.borrowed, self.returned, self.wait)
+
+    def _book_id(self, isbn, title):
+        if isbn not in self._isbn_ids:
+            self._isbn_ids[isbn] = len(self.isbns)
+            self.isbns.append(isbn)
+            self.titles.append(title)
+        return self._isbn_ids[isbn]
+
+    def _user_id(self, user):
+        if user not in self._user_ids:
+            self._user_ids[user] = len(self.users)
+            self.users.append(user)
+        return self._user_ids[user]
+
+    @staticmethod
+    def _ordinal(date):     # Accepts YYYY-MM-DD strings, datetime objects or date ordinals
+        if isinstance(date, int):
+            return date
+        if isinstance(date, str):
+            return datetime.strptime(date, '%Y-%m-%d').toordinal()
+        return date.toordinal()
+
+    def __len__(self):
+        return len(self.book)
+
+    def record_loan(self, isbn, title, user, borrowed, returned=None, wait=-1):      # Appends one loan
+        borrowed = self._ordinal(borrowed)
+        if self.borrowed and borrowed < self.borrowed[-1]:
+            self.in_order = False
+        self.book.append(self._book_id(isbn, title))
+        self.user.append(self._user_id(user))
+        self.borrowed.append(borrowed)
+        self.returned.append(self._ordinal(returned) if returned else 0)
+        self.wait.append(wait)
+        if not returned:
+            self.open_loans[isbn] = len(self.book) - 1
+        return len(self.book) - 1
+
+    def close_loan(self, isbn, returned):
+        row = self.open_loans.pop(isbn, None)
+        if row is not None:
+            self.returned[row] = self._ordinal(returned)
+
+    def handle_event(self, event):      # ChangeEventBus listener: records loans as they happen
+        today = event.timestamp[:10]
+        if event.type == "book_borrowed":
+            self.close_loan(event.isbn, today)
+            self.record_loan(event.isbn, event.title, event.user, event.date or today)
+        elif event.type == "queue_joined":
+            self.waiting[(event.isbn, event.user)] = self._ordinal(event.date or today)
+        elif event.type == "queue_handoff":
+            self.close_loan(event.isbn, today)
+            joined = self.waiting.pop((event.isbn, event.user), None)
+            wait = self._ordinal(today) - joined if joined is not None else -1
+            self.record_loan(event.isbn, event.title, event.user, today, wait=wait)
+        elif event.type in ("book_returned", "book_removed"):
+            self.close_loan(event.isbn, today)
+        elif event.type == "queue_expired":
+            self.waiting.pop((event.isbn, event.user), None)
+
+    # Utility function to get the rows to scan for loans borrowed before end (rows are cut off with bisect when in order)
+    def _rows_before(self, end):
+        if end is None:
+            return len(self.book)
+        end = self._ordinal(end)
+        if self.in_order:
+            return bisect_left(self.borrowed, end)
+        return len(self.book)
+
+    def _in_range(self, start, end):        # Row indexes of loans borrowed in [start, end)
+        start = self._ordinal(start) if start else None
+        end_ordinal = self._ordinal(end) if end else None
+        stop = self._rows_before(end)
+        if self.in_order:
+            first = bisect_left(self.borrowed, start, 0, stop) if start is not None else 0
+            return range(first, stop)
+        borrowed = self.borrowed
+        return [row for row in range(stop) if (start is None or borrowed[row] >= start) and (end_ordinal is None or borrowed[row] < end_ordinal)]
+
+    def top_borrowed(self, n=10, start=None, end=None):        # [(isbn, title, loans)] for the n most borrowed books
+        rows = self._in_range(start, end)
+        if isinstance(rows, range):
+            counts = Counter(self.book[rows.start:rows.stop])       # Counting a contiguous slice runs in C
+        else:
+            counts = Counter(self.book[row] for row in rows)
+        return [(self.isbns[book], self.titles[book], loans) for book, loans in counts.most_common(n)]
+
+    def loans_per_user(self, start=None, end=None):        # {user: loans}, most active first
+        rows = self._in_range(start, end)
+        if isinstance(rows, range):
+            counts = Counter(self.user[rows.start:rows.stop])
+        else:
+            counts = Counter(self.user[row] for row in rows)
+        return {self.users[user]: loans for user, loans in counts.most_common()}
+
+    def average_queue_wait(self, start=None, end=None):        # Average days a reservation waited, over loans that came from the queue
+        rows = self._in_range(start, end)
+        waits = self.wait[rows.start:rows.stop] if isinstance(rows, range) else [self.wait[row] for row in rows]
+        queued = [days for days in waits if days >= 0]
+        return sum(queued) / len(queued) if queued else 0.0
+
+    def utilization(self, start, end, copies):      # Share of copy-days on loan in [start, end), overall (over copies books in the catalog) and per ISBN
+        start, end = self._ordinal(start), self._ordinal(end)
+        days = end - start
+        today = datetime.today().toordinal()
+        on_loan = defaultdict(int)
+        stop = self._rows_before(end)
+        for book, borrowed, returned in zip(self.book[:stop], self.borrowed[:stop], self.returned[:stop]):
+            overlap = min(returned or today, end) - max(borrowed, start)     # Open loans count up to today
+            if overlap > 0:
+                on_loan[book] += overlap
+        overall = sum(on_loan.values()) / (days * copies) if days > 0 and copies else 0.0
+        return overall, {self.isbns[book]: loan_days / days for book, loan_days in on_loan.items()}
+
+    def save(self, filename=None):      # Header line (JSON) with the ISBN/user tables, followed by the raw columns
+        import json
+        header = {"isbns": self.isbns, "titles": self.titles, "users": self.users, "rows": len(self.book), "in_order": self.in_order}
+        with open(filename or self.filename, mode='wb') as file:
+            file.write(json.dumps(header).encode('utf-8') + b"\n")
+            for column in self._columns():
+                column.tofile(file)
+
+    def load(self, filename=None):
+        import json
+        try:
+            with open(filename or self.filename, mode='rb') as file:
+                header = json.loads(file.readline())
+                for column in self._columns():
+                    column.fromfile(file, header['rows'])
+        except FileNotFoundError:
+            return
+        self.isbns, self.titles, self.users = header['isbns'], header['titles'], header['users']
+        self.in_order = header['in_order']
+        self._isbn_ids = {isbn: i for i, isbn in enumerate(self.isbns)}
+        self._user_ids = {user: i for i, user in enumerate(self.users)}
+        self.open_loans = {self.isbns[self.book[row]]: row for row in range(len(self.book)) if self.returned[row] == 0}
+
+    def display_reports(self, copies, days=30, n=5):       # copies: number of books in the catalog, for the utilization figure
+        if not len(self):
+            echo(Fore.RED + "\nNo loan history yet.")
+            return
+        today = datetime.today()
+        start = datetime.fromordinal(today.toordinal() - days)
+        echo(Fore.YELLOW + "-------------------------------------------------------------------")
+        echo(Fore.YELLOW + f"Top {n} Most Borrowed Books")
+        echo(Fore.YELLOW + "-------------------------------------------------------------------")
+        for isbn, title, loans in self.top_borrowed(n):
+            echo(Fore.GREEN + f"{isbn}\t|\t{loans} loans\t|\t{title}")
+        echo(Fore.YELLOW + "-------------------------------------------------------------------")
+        echo(Fore.YELLOW + "Loans per User")
+        echo(Fore.YELLOW + "-------------------------------------------------------------------")
+        for user, loans in self.loans_per_user().items():
+            echo(Fore.GREEN + f"{user}\t|\t{loans} loans")
+        echo(Fore.YELLOW + "-------------------------------------------------------------------")
+        overall, _ = self.utilization(start, datetime.fromordinal(today.toordinal() + 1), copies)
+        echo(Fore.GREEN + f"Average queue wait: {self.average_queue_wait():.1f} days")
+        echo(Fore.GREEN + f"Utilization over the last {days} days: {overall:.1%} of {copies} books")
+        echo(Fore.YELLOW + "-------------------------------------------------------------------")
+
 # ===============================================
 # CSV Manager (For Reading and Writing into CSV File)
 # ===============================================
@@ -652,21 +1967,802 @@ class CSVManager:
     row.get('user', ''),  # If 'user' is missing, default to an empty string
     row.get('date', '')   # If 'date' is missing, default to an empty string
 )
-            print(Fore.GREEN + "\nBooks loaded from CSV.")
+            echo(Fore.GREEN + "\nBooks loaded from CSV.")
         except FileNotFoundError:       #If CSV file is not found, catch a FileNotFoundError.
-            print(Fore.RED + "\nCSV file not found.")
+            echo(Fore.RED + "\nCSV file not found.")
 
     def save_books(self, book_manager):
         with open(self.filename, mode='w', newline='') as file:
             writer = csv.DictWriter(file, fieldnames=['isbn', 'title', 'user', 'date'])
             writer.writeheader()
-            writer.writerows(book_manager.get_books())
-        print(Fore.GREEN + "\nBooks saved to CSV.")
+            writer.writerows(book_manager.iter_books())     # Stream rows instead of copying the whole catalog first
+        echo(Fore.GREEN + "\nBooks saved to CSV.")
+
+    def find_book(self, isbn):      # Looks up one ISBN by scanning the file directly, without loading it into a data structure
+        needle = "\n" + isbn + ","     # ISBN is the first column, so a match starts right after a line break
+        try:
+            with open(self.filename, mode='r', newline='') as file:
+                fieldnames = next(csv.reader([file.readline()]), [])
+                block = "\n"
+                while True:
+                    chunk = file.read(1 << 20)      # Read 1 MB at a time and let str.find do the scanning
+                    if not chunk:
+                        return None
+                    block += chunk
+                    start = block.find(needle)
+                    if start != -1:
+                        end = block.find("\n", start + 1)
+                        while end == -1:        # The matching row continues in the next chunk
+                            chunk = file.read(1 << 16)
+                            if not chunk:
+                                end = len(block)
+                                break
+                            block += chunk
+                            end = block.find("\n", start + 1)
+                        row = dict(zip(fieldnames, next(csv.reader([block[start + 1:end].rstrip("\r")]))))
+                        return {"isbn": row['isbn'], "title": row['title'], "user": row.get('user') or '', "date": row.get('date') or ''}
+                    block = block[-len(needle):]    # Keep the tail in case a match is split across two chunks
+        except FileNotFoundError:
+            echo(Fore.RED + "\nCSV file not found.")
+            return None
+
+# ===============================================
+# Catalog Loader (Loads the CSV at start-up, optionally in the background for a fast start)
+# ===============================================
+class CatalogLoader:
+    def __init__(self, csv_manager, book_manager, background=False):
+        self.csv_manager = csv_manager
+        self.book_manager = book_manager
+        self.done = threading.Event()
+        self.error = None
+        if background:      # Build the data structure in a daemon thread; lookups meanwhile go through CSVManager.find_book
+            threading.Thread(target=self._load, args=(True,), daemon=True).start()
+        else:
+            self._load(False)
+
+    def _load(self, quiet):
+        try:
+            if quiet:
+                with quiet_output():
+                    self._load_books()
+            else:
+                self._load_books()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def _load_books(self):
+        if isinstance(self.book_manager, SQLiteBookManager):
+            if self.book_manager.is_empty():        # The database keeps its data between runs, so only import the CSV the first time
+                self.book_manager.import_csv(self.csv_manager.filename)
+        else:
+            self.csv_manager.load_books(self.book_manager)
+
+    def ready(self):
+        return self.done.is_set()
+
+    def wait(self):     # Blocks until the data structure is fully built
+        self.done.wait()
+        if self.error:
+            raise self.error
+
+    def search_book(self, isbn):        # ISBN lookup that does not wait for the data structure
+        if self.ready():
+            return self.book_manager.search_book(isbn=isbn)
+        return self.csv_manager.find_book(isbn)
+
+# ===============================================
+# Headless Batch Mode (Commands from a file or stdin, no menus or prompts)
+# ===============================================
+class BatchRunner:
+    # One command per line. Blank lines and lines starting with '#' are skipped.
+    # command: (usage, minimum arguments, maximum arguments). The last argument may contain spaces (e.g. a title).
+    COMMANDS = {
+        "add": ("add ISBN TITLE", 2, 2),
+        "remove": ("remove ISBN", 1, 1),
+        "search": ("search ISBN", 1, 1),
+        "find": ("find TITLE", 1, 2),
+        "borrow": ("borrow ISBN USER [YYYY-MM-DD]", 2, 2),
+        "return": ("return ISBN USER", 2, 2),
+        "list": ("list", 0, 0),
+        "borrowed": ("borrowed [USER]", 0, 1),
+        "overdue": ("overdue", 0, 0),
+        "queue": ("queue", 0, 0),
+        "undo": ("undo", 0, 0),
+        "redo": ("redo", 0, 0),
+        "save": ("save [FILE]", 0, 1),
+    }
+
+    def __init__(self, book_manager, days_due=14, csv_manager=None, json_lines=False, output=None, buffer_size=1000, transaction_size=1000):
+        self.book_manager = book_manager
+        self.days_due = days_due
+        self.csv_manager = csv_manager or CSVManager()
+        self.undo_redo = UndoRedoStack()
+        self.json_lines = json_lines        # Write results as JSON lines instead of tab-separated text
+        self.output = output or sys.stdout
+        self.buffer_size = buffer_size      # Results are written in chunks of this many lines
+        self.buffer = []
+        self.transaction_size = transaction_size        # SQLite: commands are committed together in groups of this many lines
+
+    def execute(self, line):        # Runs one command and returns its result as a dictionary (nothing is printed)
+        parts = line.split(maxsplit=2)
+        command = parts[0].lower() if parts else ''
+        args = parts[1:]
+        if command not in self.COMMANDS:
+            return {"command": command, "ok": False, "error": "unknown command"}
+        usage, min_args, max_args = self.COMMANDS[command]
+        if not min_args <= len(args) <= max_args:
+            return {"command": command, "ok": False, "error": "usage: " + usage}
+        try:
+            return dict(command=command, **getattr(self, "_cmd_" + command)(*args))
+        except Exception as e:      # One failing command is reported like any other error, the rest of the batch still runs
+            return {"command": command, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def _cmd_add(self, isbn, title):
+        if self.book_manager.search_book(isbn=isbn):
+            return {"ok": False, "error": "book with this ISBN already exists"}
+        self.book_manager.add_book(isbn, title, '', '')
+        self.undo_redo.push_undo({"type": "add", "isbn": isbn, "title": title, "user": '', "date": ''})
+        return {"ok": True, "isbn": isbn}
+
+    def _cmd_remove(self, isbn):
+        book = self.book_manager.search_book(isbn=isbn)
+        if not book or not self.book_manager.remove_book(isbn=isbn):
+            return {"ok": False, "error": "book not found"}
+        self.undo_redo.push_undo({"type": "remove", "isbn": book['isbn'], "title": book['title']})
+        return {"ok": True, "isbn": isbn}
+
+    def _cmd_search(self, isbn):
+        book = self.book_manager.search_book(isbn=isbn)
+        return {"ok": book is not None, "book": book}
+
+    def _cmd_find(self, *words):
+        if isinstance(self.book_manager, (BinarySearchTree, AVLTree)):
+            return {"ok": False, "error": "title search is not supported by this data structure"}
+        book = self.book_manager.search_book(title=" ".join(words))
+        return {"ok": book is not None, "book": book}
+
+    def _cmd_borrow(self, isbn, rest):
+        user, _, date = rest.partition(" ")
+        date = date.strip() or datetime.today().strftime('%Y-%m-%d')
+        try:
+            datetime.strptime(date, '%Y-%m-%d')     # The overdue report and the scheduler parse this format
+        except ValueError:
+            return {"ok": False, "error": "date must be YYYY-MM-DD"}
+        if not self.book_manager.search_book(isbn=isbn):
+            return {"ok": False, "error": "book not found"}
+        borrowed = self.book_manager.borrow_book(isbn=isbn, user=user, date=date)
+        return {"ok": True, "isbn": isbn, "user": user, "status": "borrowed" if borrowed else "queued"}
+
+    def _cmd_return(self, isbn, user):
+        if self.book_manager.return_book(isbn, user):
+            return {"ok": True, "isbn": isbn, "user": user}
+        return {"ok": False, "error": "book not borrowed by this user"}
+
+    def _cmd_list(self):
+        with self.book_manager.snapshot() as snapshot:
+            return {"ok": True, "books": snapshot.get_books()}
+
+    def _cmd_borrowed(self, user=None):
+        if user:
+            return {"ok": True, "books": self.book_manager.get_user_borrowed_books(user)}
+        return {"ok": True, "books": self.book_manager.get_borrowed_books()}
+
+    def _cmd_overdue(self):
+        with self.book_manager.snapshot() as snapshot:
+            heap = snapshot.get_max_heap_overdue_books(self.days_due)
+        books = []
+        while heap:
+            entry = hq.heappop(heap)[1]
+            books.append(dict(entry[0], days_overdue=entry[1]))
+        return {"ok": True, "books": books}
+
+    def _cmd_queue(self):
+        return {"ok": True, "queue": self.book_manager.borrow_queue}
+
+    def _cmd_undo(self):
+        action = self.undo_redo.undo(self.book_manager)
+        return {"ok": action is not None, "action": action}
+
+    def _cmd_redo(self):
+        action = self.undo_redo.redo(self.book_manager)
+        return {"ok": action is not None, "action": action}
+
+    def _cmd_save(self, filename=None):
+        csv_manager = CSVManager(filename) if filename else self.csv_manager
+        with self.book_manager.snapshot() as snapshot:
+            csv_manager.save_books(snapshot)
+        return {"ok": True, "file": csv_manager.filename}
+
+    def format_result(self, result):
+        if self.json_lines:
+            import json
+            return json.dumps(result)
+        lines = ["\t".join(["ok" if result["ok"] else "error", result["command"]] + [str(result[key]) for key in ("isbn", "user", "status", "error") if key in result])]
+        if result.get("book"):
+            lines.append("\t".join(str(value) for value in result["book"].values()))
+        for book in result.get("books", []):
+            lines.append("\t".join(str(value) for value in book.values()))
+        for isbn, users in result.get("queue", {}).items():
+            lines.append("\t".join([isbn] + [user_info['user'] for user_info in users]))
+        return "\n".join(lines)
+
+    def write(self, text):
+        self.buffer.append(text)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.output.write("\n".join(self.buffer) + "\n")
+            self.buffer = []
+
+    def run(self, lines):       # Executes every command and returns a summary (commands, errors, seconds)
+        commands = errors = 0
+        start = time.perf_counter()
+        # On SQLite one commit per command dominates the run time, so the commands share a transaction per group of lines
+        transaction = self.book_manager.transaction if isinstance(self.book_manager, SQLiteBookManager) else nullcontext
+        lines = iter(lines)
+        try:
+            with quiet_output():
+                while chunk := list(islice(lines, self.transaction_size)):
+                    with transaction():
+                        for line in chunk:
+                            line = line.strip()
+                            if not line or line.startswith('#'):
+                                continue
+                            result = self.execute(line)
+                            commands += 1
+                            errors += not result["ok"]
+                            self.write(self.format_result(result))
+        finally:
+            self.flush()        # Results written so far are not lost if the input fails
+        return {"commands": commands, "errors": errors, "seconds": time.perf_counter() - start}
+
+# ===============================================
+# Benchmarks (Comparing the data structures)
+# ===============================================
+BENCHMARK_STRUCTURES = [        # (name, factory) for every data structure that can be selected in the main menu
+    ("Static Array", lambda size: StaticBookArray(capacity=size)),
+    ("Dynamic Linked List", lambda size: DynamicBookLinkedList()),
+    ("Binary Search Tree (BST)", lambda size: BinarySearchTree()),
+    ("AVL Tree", lambda size: AVLTree()),
+    ("B+ Tree", lambda size: BPlusTree()),
+    ("Sorted Array", lambda size: SortedBookArray()),
+    ("SQLite (in-memory)", lambda size: SQLiteBookManager(":memory:")),
+]
+
+def _timed(function):       # Runs the function once and returns the elapsed time in milliseconds
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+def benchmark_structures(sizes=(1000, 5000), lookups=1000, days_due=14, seed=42):
+    import random       # The benchmarks and the differential test import what they need, so a plain start doesn't pay for it
+    rng = random.Random(seed)
+    for size in sizes:
+        isbns = [str(isbn) for isbn in rng.sample(range(10**9, 10**10), size)]    # Random order keeps the BST from degenerating
+        lookup_isbns = [rng.choice(isbns) for _ in range(lookups)]
+        borrowed = set(rng.sample(isbns, size // 10))       # Every tenth book is on loan, for the overdue report
+        new_isbns = [str(isbn) for isbn in rng.sample(range(10**10, 10**11), lookups)]      # Added one at a time, each followed by a lookup
+
+        print(Fore.YELLOW + f"\nBenchmark: {size} books, {lookups} lookups, {lookups} interleaved add+lookup (times in ms)")
+        print(Fore.YELLOW + "---------------------------------------------------------------------------------------------------------------------------")
+        print(Fore.YELLOW + "Data Structure                |  Insert\t|  Lookup\t|  Add+Lookup\t|  Full Scan\t|  Overdue Report\t|  Snapshot")
+        print(Fore.YELLOW + "---------------------------------------------------------------------------------------------------------------------------")
+        for name, factory in BENCHMARK_STRUCTURES:
+            book_manager = factory(size + lookups)
+
+            def insert():
+                for isbn in isbns:
+                    if isbn in borrowed:
+                        book_manager.add_book(isbn, f"Title {isbn}", "bench", "2000-01-01")
+                    else:
+                        book_manager.add_book(isbn, f"Title {isbn}", '', '')
+
+            def lookup():
+                for isbn in lookup_isbns:
+                    book_manager.search_book(isbn=isbn)
+
+            def add_lookup():       # The batch/interactive pattern: add a book, then look one up
+                for isbn, lookup_isbn in zip(new_isbns, lookup_isbns):
+                    book_manager.add_book(isbn, f"Title {isbn}", '', '')
+                    book_manager.search_book(isbn=lookup_isbn)
+
+            insert_ms = _timed(insert)
+            lookup_ms = _timed(lookup)
+            add_lookup_ms = _timed(add_lookup)
+            scan_ms = _timed(lambda: sum(1 for _ in book_manager.iter_books()))
+            overdue_ms = _timed(lambda: book_manager.get_max_heap_overdue_books(days_due))
+            snapshot_ms = _timed(lambda: book_manager.snapshot().close())
+            print(Fore.GREEN + f"{name:<30}|  {insert_ms:8.1f}\t|  {lookup_ms:8.1f}\t|  {add_lookup_ms:8.1f}\t|  {scan_ms:8.1f}\t|  {overdue_ms:8.1f}\t\t|  {snapshot_ms:8.3f}")
+        print(Fore.YELLOW + "---------------------------------------------------------------------------------------------------------------------------")
+
+def benchmark_startup(rows=10**6, choice="5"):
+    import tempfile
+    print(Fore.YELLOW + f"\nStart-up benchmark: {rows:,} rows, time to answer one ISBN lookup")
+    with tempfile.TemporaryDirectory() as directory:
+        csv_manager = CSVManager(os.path.join(directory, "books.csv"))
+        with open(csv_manager.filename, mode='w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['isbn', 'title', 'user', 'date'])
+            writer.writerows((str(10**9 + i), f"Book {i}", '', '') for i in range(rows))
+        target = str(10**9 + rows - 1)      # Last row: the worst case for a file scan
+
+        def new_book_manager(name):     # SQLite gets a fresh database in the temporary directory, so both runs import the CSV
+            if choice == "7":
+                return SQLiteBookManager(os.path.join(directory, name))
+            return create_book_manager(choice)
+
+        # Eager start: build the whole data structure, then answer
+        start = time.perf_counter()
+        book_manager = new_book_manager("eager.db")
+        with quiet_output():
+            CatalogLoader(csv_manager, book_manager)
+        book_manager.search_book(isbn=target)
+        eager = time.perf_counter() - start
+
+        # Fast start: answer from the file while the data structure is built in the background
+        start = time.perf_counter()
+        loader = CatalogLoader(csv_manager, new_book_manager("fast.db"), background=True)
+        found = loader.search_book(target)
+        first_response = time.perf_counter() - start
+        loader.wait()
+        built = time.perf_counter() - start
+
+        for manager in (book_manager, loader.book_manager):
+            if isinstance(manager, SQLiteBookManager):
+                manager.close()
+
+    print(Fore.GREEN + f"Eager load, then lookup:       {eager:8.3f} s")
+    print(Fore.GREEN + f"Fast start, first response:    {first_response:8.3f} s  (found: {found is not None})")
+    print(Fore.GREEN + f"Fast start, structure ready:   {built:8.3f} s")
+
+def benchmark_history(loans=10**6, years=5, books=20000, users=5000, seed=42):
+    import random
+    rng = random.Random(seed)
+    history = LoanHistory()
+    first_day = datetime.today().toordinal() - 365 * years
+    start = time.perf_counter()
+    for i in range(loans):      # Loans arrive in borrow-date order, as they would from the event stream
+        borrowed = first_day + i * 365 * years // loans
+        book = rng.randrange(books)
+        history.record_loan(str(10**9 + book), f"Book {book}", f"user{rng.randrange(users)}", borrowed,
+                            borrowed + rng.randrange(1, 30), rng.randrange(10) if rng.random() < 0.2 else -1)
+    build = time.perf_counter() - start
+    last_year = (datetime.fromordinal(first_day + 365 * (years - 1)), datetime.today())
+
+    print(Fore.YELLOW + f"\nLoan history benchmark: {loans:,} loans over {years} years (times in s)")
+    print(Fore.GREEN + f"Append all loans:                 {build:8.3f}")
+    print(Fore.GREEN + f"Top 10 most borrowed:             {_timed(lambda: history.top_borrowed(10)) / 1000:8.3f}")
+    print(Fore.GREEN + f"Top 10 most borrowed, last year:  {_timed(lambda: history.top_borrowed(10, *last_year)) / 1000:8.3f}")
+    print(Fore.GREEN + f"Loans per user:                   {_timed(history.loans_per_user) / 1000:8.3f}")
+    print(Fore.GREEN + f"Average queue wait:               {_timed(history.average_queue_wait) / 1000:8.3f}")
+    print(Fore.GREEN + f"Utilization, last year:           {_timed(lambda: history.utilization(*last_year, copies=books)) / 1000:8.3f}")
+
+def generate_batch_script(commands, books=5000, seed=42):        # Random mix of batch commands over a fixed pool of ISBNs
+    import random
+    rng = random.Random(seed)
+    isbns = [str(isbn) for isbn in rng.sample(range(10**9, 10**10), books)]
+    users = [f"user{i}" for i in range(100)]
+    lines = [f"add {isbn} Title {isbn}" for isbn in isbns]
+    for _ in range(commands - len(lines)):
+        isbn = rng.choice(isbns)
+        action = rng.random()
+        if action < 0.4:
+            lines.append(f"search {isbn}")
+        elif action < 0.6:
+            lines.append(f"borrow {isbn} {rng.choice(users)} 2024-01-01")
+        elif action < 0.8:
+            lines.append(f"return {isbn} {rng.choice(users)}")
+        elif action < 0.9:
+            lines.append(f"remove {isbn}")
+        else:
+            lines.append(f"add {isbn} Title {isbn}")
+    return lines
+
+def benchmark_headless(commands=100000, choice="5"):
+    lines = generate_batch_script(commands)
+    print(Fore.YELLOW + f"\nHeadless benchmark: {commands} commands")
+
+    # Headless path: quiet library calls, results buffered into one output stream
+    runner = BatchRunner(create_book_manager(choice), output=io.StringIO())
+    headless = runner.run(lines)["seconds"]
+
+    # Interactive path: the menu and the colored messages are printed for every command (to /dev/null, so the
+    # terminal itself is not measured; a real terminal is slower still)
+    runner = BatchRunner(create_book_manager(choice))
+    with open(os.devnull, mode='w') as devnull, redirect_stdout(devnull):
+        start = time.perf_counter()
+        for line in lines:
+            print_main_menu(choice)
+            print(Fore.GREEN + runner.format_result(runner.execute(line)))
+        interactive = time.perf_counter() - start
+
+    print(Fore.GREEN + f"Headless:    {headless:8.2f} s  ({commands / headless:>10,.0f} ops/sec)")
+    print(Fore.GREEN + f"Interactive: {interactive:8.2f} s  ({commands / interactive:>10,.0f} ops/sec)")
+
+# ===============================================
+# Differential Testing (Random operations against every data structure and a reference model)
+# ===============================================
+class ReferenceBookManager(BookManagerBase):
+    # Trivially correct model of the BookManagerBase contract: a dictionary keyed by ISBN
+    def __init__(self):
+        self.books = {}
+        self.borrow_queue = {}
+
+    def add_book(self, isbn, title, user='', date=''):
+        if isbn not in self.books:
+            self.books[isbn] = {"isbn": isbn, "title": title, "user": user, "date": date}
+
+    def remove_book(self, isbn=None, title=None):
+        book = self.search_book(isbn, title)
+        if book:
+            del self.books[book['isbn']]
+        return book
+
+    def get_books(self):
+        return list(self.books.values())
+
+    # Borrowing and returning are written out here instead of inherited, so the shared queue logic is checked, not copied.
+    # borrow_queue[isbn] lists the current borrower of the copy first, then the reservations in the order they were made.
+    def borrow_book(self, isbn=None, title=None, user=None, date=None):
+        book = self.search_book(isbn, title)
+        if not book:
+            return None
+        queue = self.borrow_queue.setdefault(book['isbn'], [])
+        if book['user'] == '':
+            book['user'], book['date'] = user, date
+            queue[:] = [{"user": user, "date": date}]
+            return True
+        if not queue:
+            queue.append({"user": book['user'], "date": book['date']})
+        queue.append({"user": user, "date": date})
+        return False
+
+    def _borrowed_copy(self, isbn, user):
+        book = self.books.get(isbn)
+        return book if book and book['user'] == user else None
+
+    def return_book(self, isbn=None, user=None):
+        book = self._borrowed_copy(isbn, user)
+        if not book:
+            return False
+        book['user'], book['date'] = '', ''
+        queue = self.borrow_queue.pop(isbn, [])
+        users = [entry['user'] for entry in queue]
+        if user in users:
+            del queue[users.index(user)]        # The returning borrower
+        if queue:
+            self.borrow_queue[isbn] = queue
+            book['user'], book['date'] = queue[0]['user'], queue[0]['date']     # The next reservation takes the book
+        return True
+
+class ReferenceBookList(ReferenceBookManager):
+    # Model of the structures that accept duplicate ISBNs (Static Array, Dynamic Linked List): books are kept in the
+    # order they were added, searches and removals act on the first match, and a return on the user's own copy
+    def __init__(self):
+        super().__init__()
+        self.books = []
+
+    def add_book(self, isbn, title, user='', date=''):
+        self.books.append({"isbn": isbn, "title": title, "user": user, "date": date})
+
+    def remove_book(self, isbn=None, title=None):
+        book = self.search_book(isbn, title)
+        if book:
+            del self.books[next(i for i, other in enumerate(self.books) if other is book)]
+        return book
+
+    def get_books(self):
+        return self.books
+
+    def _borrowed_copy(self, isbn, user):
+        return next((book for book in self.books if book['isbn'] == isbn and book['user'] == user), None)
+
+class DifferentialHarness:
+    # Generates a random sequence of add/remove/search/borrow/return/undo/redo operations, runs each one on the
+    # reference model and on every data structure, and compares the results and the full state (books and queue).
+    # Some adds repeat an ISBN that is already in the catalog: the Static Array and Dynamic Linked List accept the
+    # duplicate and are compared with ReferenceBookList, the other structures reject it like ReferenceBookManager.
+    # Every title is shared by two ISBNs (two copies of the same book). Which copy a shared title finds depends on the structure's order, so title
+    # operations are only generated while the other copy is not in the catalog. They are run by ISBN on the structures
+    # that only search by ISBN (BST and AVL Tree). At every state check a snapshot
+    # is taken, and at the next check it must still hold the books it was taken with.
+    TITLE_SEARCH = (StaticBookArray, DynamicBookLinkedList, BPlusTree, SortedBookArray, SQLiteBookManager, ReferenceBookManager)
+    DUPLICATE_ISBNS = (StaticBookArray, DynamicBookLinkedList)
+    # Order 3 keeps the B+ tree deep enough that internal nodes split, borrow and merge
+    STRUCTURES = BENCHMARK_STRUCTURES + [("B+ Tree (order 3)", lambda size: BPlusTree(order=3))]
+    USERS = ("alice", "bob", "carol", "dave")
+    DATES = ("2024-01-01", "2024-02-15", "2024-03-30")
+
+    def __init__(self, seed=0, isbn_pool=200, check_every=1, structures=None):
+        import random
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.isbn_pool = [str(10**9 + i) for i in range(isbn_pool)]
+        # Compare the full state every check_every operations. Results are always compared, and in between full checks
+        # so is the book and queue of the ISBN each operation touched.
+        self.check_every = check_every
+        self.structures = structures or self.STRUCTURES
+
+    @staticmethod
+    def _title(isbn):       # ISBNs 2k and 2k+1 of the pool are copies of the same title
+        return f"Title {(int(isbn) - 10**9) // 2}"
+
+    @staticmethod
+    def _other_copy(isbn):
+        return str(int(isbn) ^ 1)
+
+    def _next_op(self, reference, undo_redo):
+        rng = self.rng
+        isbn = rng.choice(self.isbn_pool)
+        book = reference.books.get(isbn)
+        by_title = book is not None and self._other_copy(isbn) not in reference.books and rng.random() < 0.3
+        title = (book['title'].upper() if rng.random() < 0.5 else book['title'].lower()) if by_title else None
+        action = rng.random()
+        if action < 0.25:
+            if book and rng.random() < 0.8:     # Mostly fresh ISBNs, sometimes a duplicate
+                return ("search", isbn, title)
+            return ("add", isbn, self._title(isbn))
+        if action < 0.35:
+            return ("remove", isbn, title)
+        if action < 0.55:
+            return ("search", isbn, title)
+        if action < 0.75:
+            return ("borrow", isbn, title, rng.choice(self.USERS), rng.choice(self.DATES))
+        if action < 0.9:
+            user = book['user'] if book and book['user'] and rng.random() < 0.7 else rng.choice(self.USERS)
+            return ("return", isbn, user)
+        return ("undo",) if action < 0.95 else ("redo",)
+
+    def _apply(self, book_manager, undo_redo, op):
+        title_search = isinstance(book_manager, self.TITLE_SEARCH)
+        kind = op[0]
+        if kind == "add":
+            book_manager.add_book(op[1], op[2], '', '')
+            undo_redo.push_undo({"type": "add", "isbn": op[1], "title": op[2], "user": '', "date": ''})
+            return None
+        if kind in ("remove", "search", "borrow"):
+            isbn, title = op[1], op[2]
+            if title and title_search:
+                isbn = None
+            else:
+                title = None
+            if kind == "remove":
+                removed = book_manager.remove_book(isbn=isbn, title=title) if title_search else book_manager.remove_book(isbn=isbn)
+                if removed:
+                    undo_redo.push_undo({"type": "remove", "isbn": op[1], "title": self._title(op[1])})
+                return bool(removed)
+            if kind == "search":
+                book = book_manager.search_book(isbn=isbn, title=title)
+                return dict(book) if book else None
+            return book_manager.borrow_book(isbn=isbn, title=title, user=op[3], date=op[4])
+        if kind == "return":
+            return bool(book_manager.return_book(op[1], op[2]))
+        if kind == "undo":
+            return undo_redo.undo(book_manager) is not None
+        return undo_redo.redo(book_manager) is not None
+
+    @staticmethod
+    def _state(book_manager):
+        books = sorted(map(itemgetter('isbn', 'title', 'user', 'date'), book_manager.get_books()))
+        # The queue is compared as it is (not copied): the reference model doesn't change while the structures are checked
+        return books, getattr(book_manager, 'borrow_queue', {})
+
+    @staticmethod
+    def _book_state(book_manager, isbn):        # The part of the state one operation can change: one book and its queue
+        book = book_manager.search_book(isbn=isbn)
+        queue = book_manager.borrow_queue.get(isbn, [])
+        return (dict(book) if book else None), [dict(entry) for entry in queue]
+
+    @staticmethod
+    def _touched(op, undo_redo):        # The ISBN an operation changes (for undo/redo, the one of the action it replays)
+        if len(op) > 1:
+            return op[1]
+        stack = undo_redo.undo_stack if op[0] == "undo" else undo_redo.redo_stack
+        return stack[-1]['isbn'] if stack else None
+
+    def run(self, ops=10000):       # Returns {"ops", "seconds" per structure, "divergence" (None if every step matched)}
+        reference, reference_undo = ReferenceBookManager(), UndoRedoStack()
+        duplicates, duplicates_undo = ReferenceBookList(), UndoRedoStack()
+        # Each operation adds at most one book, so the static array never fills up
+        backends = [(name, factory(len(self.isbn_pool) + ops), UndoRedoStack()) for name, factory in self.structures]
+        seconds = {name: 0.0 for name, _, _ in backends}
+        snapshots = {}      # name: (snapshot, books at the time it was taken)
+        with quiet_output():
+            for step in range(ops):
+                op = self._next_op(reference, reference_undo)
+                check_state = step % self.check_every == 0 or step == ops - 1
+                models = {}     # accepts duplicates: (result, state to compare with)
+                for accepts, model, undo_redo in ((False, reference, reference_undo), (True, duplicates, duplicates_undo)):
+                    isbn = self._touched(op, undo_redo)
+                    result = self._apply(model, undo_redo, op)
+                    if check_state:
+                        models[accepts] = (result, self._state(model))
+                    else:
+                        models[accepts] = (result, isbn and self._book_state(model, isbn))
+                for name, book_manager, undo_redo in backends:
+                    expected, expected_state = models[isinstance(book_manager, self.DUPLICATE_ISBNS)]
+                    isbn = None if check_state else self._touched(op, undo_redo)
+                    start = time.perf_counter()
+                    try:
+                        actual = self._apply(book_manager, undo_redo, op)
+                    except Exception as e:      # A crash is reported like any other divergence
+                        return {"ops": step + 1, "seconds": seconds, "divergence": f"seed {self.seed}, step {step}, {name}: {op} raised {type(e).__name__}: {e}"}
+                    seconds[name] += time.perf_counter() - start
+                    if actual != expected:
+                        return {"ops": step + 1, "seconds": seconds, "divergence": f"seed {self.seed}, step {step}, {name}: {op} returned {actual!r}, expected {expected!r}"}
+                    if not check_state:
+                        if isbn and self._book_state(book_manager, isbn) != expected_state:
+                            return {"ops": step + 1, "seconds": seconds, "divergence": f"seed {self.seed}, step {step}, {name}: book {isbn} differs after {op}: {self._book_state(book_manager, isbn)}, expected {expected_state}"}
+                        continue
+                    actual_state = self._state(book_manager)
+                    if actual_state != expected_state:
+                        detail = "books" if actual_state[0] != expected_state[0] else "borrow queue"
+                        if detail == "books":       # Counted, so an extra or missing duplicate shows up too
+                            extra, missing = Counter(actual_state[0]), Counter(expected_state[0])
+                            difference = f"unexpected {list((extra - missing).elements())}, missing {list((missing - extra).elements())}"
+                        else:
+                            difference = actual_state[1]
+                        return {"ops": step + 1, "seconds": seconds, "divergence": f"seed {self.seed}, step {step}, {name}: {detail} differ after {op}: {difference}"}
+                    if name in snapshots:
+                        snapshot, books = snapshots.pop(name)
+                        with snapshot:
+                            if self._state(snapshot)[0] != books:
+                                return {"ops": step + 1, "seconds": seconds, "divergence": f"seed {self.seed}, step {step}, {name}: snapshot changed after {op}"}
+                    snapshots[name] = (book_manager.snapshot(), expected_state[0])
+        for snapshot, _ in snapshots.values():
+            snapshot.close()
+        for _, book_manager, _ in backends:
+            if isinstance(book_manager, SQLiteBookManager):
+                book_manager.close()
+        return {"ops": ops, "seconds": seconds, "divergence": None}
+
+def run_differential_test(ops=10000, seed=0, scale=False, pool=None):
+    if scale:       # Long run: at least one million operations over a catalog that grows with the run
+        ops = max(ops, 10**6)
+    pool = pool or (max(200, ops // 1000) if scale else 200)        # Number of distinct ISBNs (about the catalog size)
+    # The full state is compared after every operation. At scale that would be O(catalog) per operation, so only the
+    # book and queue each operation touched are compared, with a full comparison every 10000 operations.
+    harness = DifferentialHarness(seed=seed, isbn_pool=pool, check_every=10000 if scale else 1)
+    print(Fore.YELLOW + f"\nDifferential test: {ops:,} operations over {pool:,} ISBNs, seed {seed}")
+    result = harness.run(ops)
+    print(Fore.YELLOW + "-------------------------------------------------------------------")
+    print(Fore.YELLOW + "Data Structure                |  ops/sec")
+    print(Fore.YELLOW + "-------------------------------------------------------------------")
+    for name, seconds in result["seconds"].items():
+        print(Fore.GREEN + f"{name:<30}|  {result['ops'] / seconds if seconds else 0:>12,.0f}")
+    print(Fore.YELLOW + "-------------------------------------------------------------------")
+    if result["divergence"]:
+        print(Fore.RED + f"\nDivergence found: {result['divergence']}")
+        return False
+    print(Fore.GREEN + f"\nAll data structures matched the reference model for {result['ops']:,} operations.")
+    return True
 
 # ===============================================
 # User Interface Main Menu
 # ===============================================
+def create_book_manager(choice):        # Returns the data structure for a main menu choice, or None if the choice is invalid
+    if choice == "1":
+        return StaticBookArray()
+    elif choice == "2":
+        return DynamicBookLinkedList()
+    elif choice == "3":
+        return BinarySearchTree()
+    elif choice == "4":
+        return AVLTree()
+    elif choice == "5":
+        return BPlusTree()
+    elif choice == "6":
+        return SortedBookArray()
+    elif choice == "7":
+        return SQLiteBookManager()
+    return None
+
+def create_event_bus(events=None, events_socket=None):      # Event bus with the sinks from --events FILE and --events-socket HOST:PORT
+    event_bus = ChangeEventBus()
+    if events:
+        event_bus.subscribe(FileEventSink(events))
+    if events_socket:
+        host, _, port = events_socket.rpartition(":")
+        event_bus.subscribe(SocketEventSink(host or "127.0.0.1", int(port)))
+    return event_bus
+
+def print_main_menu(choice):
+    print(Fore.MAGENTA + "\n+-------------------------------+")
+    if choice == "1":
+        print(Fore.MAGENTA + "|         STATIC ARRAY          |")
+    elif choice == "2":
+        print(Fore.MAGENTA + "|      DYNAMIC LINKED LIST      |")
+    elif choice == "3":
+        print(Fore.MAGENTA + "|   BINARY SEARCH TREE (BST)    |")
+    elif choice == "4":
+        print(Fore.MAGENTA + "|           AVL TREE            |")
+    elif choice == "5":
+        print(Fore.MAGENTA + "|            B+ TREE            |")
+    elif choice == "6":
+        print(Fore.MAGENTA + "|         SORTED ARRAY          |")
+    elif choice == "7":
+        print(Fore.MAGENTA + "|        SQLITE DATABASE        |")
+    print(Fore.MAGENTA + "|           MAIN MENU           |")
+    print(Fore.MAGENTA + "+-------------------------------+")
+    print(Fore.MAGENTA + "| 1. Display All Books          |")
+    print(Fore.MAGENTA + "| 2. Add Book                   |")
+    print(Fore.MAGENTA + "| 3. Search Book                |")
+    print(Fore.MAGENTA + "| 4. Borrow Book                |")
+    print(Fore.MAGENTA + "| 5. Display Borrow Queue       |")
+    print(Fore.MAGENTA + "| 6. Display Overdue Books      |")        
+    print(Fore.MAGENTA + "| 7. Return Book                |")
+    print(Fore.MAGENTA + "| 8. Remove Book                |")
+    print(Fore.MAGENTA + "| 9. Save Changes to CSV        |")
+    print(Fore.MAGENTA + "| A. Loan Reports               |")
+    print(Fore.MAGENTA + "| Z. Undo                       |")
+    print(Fore.MAGENTA + "| X. Redo                       |")
+    print(Fore.MAGENTA + "| Q. Quit                       |")
+    print(Fore.MAGENTA + "+-------------------------------+")
+
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Library Management System")
+    parser.add_argument("--benchmark", nargs="?", const="structures", choices=["structures", "headless", "startup", "history"], help="run a benchmark and exit")
+    parser.add_argument("--batch", metavar="FILE", help="run the commands in FILE ('-' for stdin) without menus, then exit")
+    parser.add_argument("--json", action="store_true", help="with --batch, write results as JSON lines")
+    parser.add_argument("--structure", default="5", choices=["1", "2", "3", "4", "5", "6", "7"], help="with --batch, the data structure to use (default: 5, B+ Tree)")
+    parser.add_argument("--no-color", action="store_true", help="disable colored output")
+    parser.add_argument("--fast-start", action="store_true", help="show the menu immediately and load the catalog in the background")
+    parser.add_argument("--fuzz", action="store_true", help="run the differential test of all data structures and exit")
+    parser.add_argument("--fuzz-ops", type=int, default=10000, help="with --fuzz, the number of random operations (default: 10000)")
+    parser.add_argument("--fuzz-seed", type=int, default=0, help="with --fuzz, the random seed (default: 0)")
+    parser.add_argument("--fuzz-scale", action="store_true", help="with --fuzz, run 10^6 operations and report throughput per data structure")
+    parser.add_argument("--fuzz-pool", type=int, help="with --fuzz, the number of distinct ISBNs (default: 200, or ops/1000 with --fuzz-scale)")
+    parser.add_argument("--events", metavar="FILE", help="append catalog change events to FILE as JSON lines")
+    parser.add_argument("--events-socket", metavar="HOST:PORT", help="stream catalog change events as JSON lines to a TCP listener")
+    args = parser.parse_args()
+    if args.no_color or args.batch:
+        set_colors(False)
+
+    if args.benchmark == "structures":
+        benchmark_structures()
+        raise SystemExit
+    if args.benchmark == "headless":
+        benchmark_headless()
+        raise SystemExit
+    if args.benchmark == "startup":
+        benchmark_startup()
+        raise SystemExit
+    if args.benchmark == "history":
+        benchmark_history()
+        raise SystemExit
+
+    if args.fuzz:
+        raise SystemExit(0 if run_differential_test(args.fuzz_ops, args.fuzz_seed, args.fuzz_scale, args.fuzz_pool) else 1)
+
+    if args.batch:
+        book_manager = create_book_manager(args.structure)
+        csv_manager = CSVManager()
+        with quiet_output():
+            CatalogLoader(csv_manager, book_manager)
+        event_bus = None
+        if args.events or args.events_socket:      # Events start after the catalog is loaded, as in the interactive menu
+            event_bus = book_manager.event_bus = create_event_bus(args.events, args.events_socket)
+        runner = BatchRunner(book_manager, csv_manager=csv_manager, json_lines=args.json)
+        try:
+            if args.batch == "-":
+                summary = runner.run(sys.stdin)
+            else:
+                with open(args.batch, mode='r') as file:
+                    summary = runner.run(file)
+        finally:
+            if event_bus:
+                event_bus.close()
+        rate = summary['commands'] / summary['seconds'] if summary['seconds'] else 0
+        sys.stderr.write(f"{summary['commands']} commands, {summary['errors']} errors in {summary['seconds']:.3f} s ({rate:,.0f} ops/sec)\n")
+        if isinstance(book_manager, SQLiteBookManager):
+            book_manager.close()
+        raise SystemExit(1 if summary['errors'] else 0)
+
     print("\n" + Fore.YELLOW + "═══════════════════════════════════════════════════════════════════════════════════════")
     print(Fore.YELLOW + "║ Welcome to The Library Management System!                                           ║")
     print(Fore.YELLOW + "║                                                                                     ║")
@@ -675,29 +2771,39 @@ if __name__ == "__main__":
     print(Fore.YELLOW + "║ 2. Dynamic Linked List                                                              ║")
     print(Fore.YELLOW + "║ 3. Binary Search Tree (BST)                                                         ║")
     print(Fore.YELLOW + "║ 4. AVL Tree                                                                         ║")
+    print(Fore.YELLOW + "║ 5. B+ Tree                                                                          ║")
+    print(Fore.YELLOW + "║ 6. Sorted Array                                                                     ║")
+    print(Fore.YELLOW + "║ 7. SQLite Database (books.db)                                                       ║")
     print(Fore.YELLOW + "═══════════════════════════════════════════════════════════════════════════════════════")
 
     while True:
-        choice = input(Fore.GREEN + "> Enter 1, 2, 3 or 4: ").strip()
-        if choice == "1":
-            book_manager = StaticBookArray()
-            break
-        elif choice == "2":
-            book_manager = DynamicBookLinkedList()
-            break
-        elif choice == "3":
-            book_manager = BinarySearchTree()
-            break
-        elif choice == "4":
-            book_manager = AVLTree()
+        choice = input(Fore.GREEN + "> Enter 1, 2, 3, 4, 5, 6 or 7: ").strip()
+        book_manager = create_book_manager(choice)
+        if book_manager:
             break
-        else:
-            print(Fore.RED + "\nInvalid choice. Please enter 1, 2, 3, or 4.")
+        print(Fore.RED + "\nInvalid choice. Please enter 1, 2, 3, 4, 5, 6, or 7.")
 
     csv_manager = CSVManager()
     undo_redo = UndoRedoStack()
-    csv_manager.load_books(book_manager)
+    loader = CatalogLoader(csv_manager, book_manager, background=args.fast_start)
     days_due = 14  # Define the number of days before a book is overdue
+    scheduler = DueDateScheduler(book_manager, days_due)     # Raises reminder, overdue and reservation expiry events as the days pass
+
+    history = LoanHistory()     # Loan history for the analytics reports, kept in loans.dat
+    history.load()
+
+    event_bus = create_event_bus(args.events, args.events_socket)       # Publishes every change to the catalog (add, remove, borrow, return, queue)
+    event_bus.subscribe(history.handle_event)
+
+    def finish_loading():       # Waits for the catalog (only blocks with --fast-start) and then starts the scheduler and events, once
+        loader.wait()
+        if book_manager.event_bus is None:
+            scheduler.load()
+            event_bus.subscribe(scheduler.handle_event)
+            book_manager.event_bus = event_bus
+
+    if loader.ready():
+        finish_loading()
 
     def prompt_user(message, options):
         while True:
@@ -707,39 +2813,23 @@ if __name__ == "__main__":
             print(Fore.RED + f"\nInvalid choice. Please enter one of {', '.join(options)}.")
 
     while True:
-        print(Fore.MAGENTA + "\n+-------------------------------+")
-        if choice == "1":
-            print(Fore.MAGENTA + "|         STATIC ARRAY          |")
-        elif choice == "2":
-            print(Fore.MAGENTA + "|      DYNAMIC LINKED LIST      |")
-        elif choice == "3":
-            print(Fore.MAGENTA + "|   BINARY SEARCH TREE (BST)    |")
-        elif choice == "4":
-            print(Fore.MAGENTA + "|           AVL TREE            |")
-        print(Fore.MAGENTA + "|           MAIN MENU           |")
-        print(Fore.MAGENTA + "+-------------------------------+")
-        print(Fore.MAGENTA + "| 1. Display All Books          |")
-        print(Fore.MAGENTA + "| 2. Add Book                   |")
-        print(Fore.MAGENTA + "| 3. Search Book                |")
-        print(Fore.MAGENTA + "| 4. Borrow Book                |")
-        print(Fore.MAGENTA + "| 5. Display Borrow Queue       |")
-        print(Fore.MAGENTA + "| 6. Display Overdue Books      |")        
-        print(Fore.MAGENTA + "| 7. Return Book                |")
-        print(Fore.MAGENTA + "| 8. Remove Book                |")
-        print(Fore.MAGENTA + "| 9. Save Changes to CSV        |")
-        print(Fore.MAGENTA + "| Z. Undo                       |")
-        print(Fore.MAGENTA + "| X. Redo                       |")
-        print(Fore.MAGENTA + "| Q. Quit                       |")
-        print(Fore.MAGENTA + "+-------------------------------+")
+        if loader.ready():
+            finish_loading()
+        scheduler.display_events(scheduler.advance_to(datetime.today()))
+        event_bus.flush()
+        print_main_menu(choice)
 
         option = input(Fore.GREEN + "> Choose option: ").strip()
+        if option not in ("3", "q", "Q"):
+            finish_loading()        # Every option except an ISBN search needs the full catalog
 
         if option == "1":
             print(Fore.YELLOW + "\nBooks in the Library:")
             print(Fore.YELLOW + "-------------------------------------------------------------------")
             print(Fore.YELLOW + "ISBN            |       Title")
             print(Fore.YELLOW + "-------------------------------------------------------------------")
-            book_manager.display_books()
+            with book_manager.snapshot() as snapshot:       # Reports read a point-in-time snapshot, not the live structure
+                snapshot.display_books()
             print(Fore.YELLOW + "-------------------------------------------------------------------")
 
         elif option == "2":
@@ -755,7 +2845,7 @@ if __name__ == "__main__":
             # For BST or AVL Tree, search only by ISBN
             if isinstance(book_manager, BinarySearchTree) or isinstance(book_manager, AVLTree):
                 isbn = input("Search by ISBN: ").strip()
-                book = book_manager.search_book(isbn=isbn)
+                book = loader.search_book(isbn)     # Answers from the CSV file while the catalog is still loading
                 if book:
                     print(Fore.GREEN + f"\nBook found: {book['title']} (ISBN: {book['isbn']})")
                 else:
@@ -765,7 +2855,11 @@ if __name__ == "__main__":
             else:
                 search_type = prompt_user(Fore.GREEN + "Search by ISBN or Title? (isbn/title): ", ["isbn", "title"])
                 value = input(f"Enter {search_type.title()}: ").strip()
-                book = book_manager.search_book(isbn=value if search_type == "isbn" else None, title=value if search_type == "title" else None)
+                if search_type == "isbn":
+                    book = loader.search_book(value)    # Answers from the CSV file while the catalog is still loading
+                else:
+                    finish_loading()
+                    book = book_manager.search_book(title=value)
                 if book:
                     print(Fore.GREEN + f"\nBook found: {book['title']} (ISBN: {book['isbn']})")
                 else:
@@ -825,7 +2919,8 @@ if __name__ == "__main__":
                     print(Fore.RED + f"Error displaying the queue: {str(e)}")
 
         elif option == "6":
-            print(book_manager.display_max_heap_overdue_books(days_due)) 
+            with book_manager.snapshot() as snapshot:
+                print(snapshot.display_max_heap_overdue_books(days_due))
 
         elif option == "7":
             user = input(Fore.GREEN + "> Enter your username: ").strip()
@@ -850,8 +2945,8 @@ if __name__ == "__main__":
                 print(Fore.RED + "\nYou haven't borrowed any books.")
 
         elif option == "8":
-            # If the data structure is Static Array or Dynamic Linked List, allow remove by ISBN or Title
-            if isinstance(book_manager, StaticBookArray) or isinstance(book_manager, DynamicBookLinkedList):
+            # If the data structure is Static Array, Dynamic Linked List, B+ Tree, Sorted Array or SQLite, allow remove by ISBN or Title
+            if isinstance(book_manager, (StaticBookArray, DynamicBookLinkedList, BPlusTree, SortedBookArray, SQLiteBookManager)):
                 remove_type = prompt_user(Fore.GREEN + "Remove by ISBN or Title? (isbn/title): ", ["isbn", "title"])
                 value = input(Fore.GREEN + f"Enter {remove_type.title()}: ").strip()
                 book = book_manager.search_book(isbn=value if remove_type == "isbn" else None, title=value if remove_type == "title" else None)
@@ -871,7 +2966,12 @@ if __name__ == "__main__":
                     print(Fore.RED + "\nBook not found.")
 
         elif option == "9":
-            csv_manager.save_books(book_manager)
+            with book_manager.snapshot() as snapshot:
+                csv_manager.save_books(snapshot)
+            history.save()
+
+        elif option.lower() == "a":
+            history.display_reports(copies=sum(1 for _ in book_manager.iter_books()))
 
         elif option.lower() == "z":
             undo_redo.undo(book_manager)
@@ -881,6 +2981,9 @@ if __name__ == "__main__":
 
         elif option.lower() == "q":
             print(Fore.GREEN + "Exiting...")
+            event_bus.close()
+            if isinstance(book_manager, SQLiteBookManager):
+                book_manager.close()
             break
 
         elif option.lower() == "g":     #hidden function, to show max-heap structure of overdue books.